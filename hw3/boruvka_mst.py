@@ -0,0 +1,167 @@
+"""
+    Parallel Borůvka minimum spanning forest for graphs loaded with hw3_q8.read_data_csr.
+
+    Each round, every component picks its cheapest outgoing edge and all picks are
+    contracted at once, so there are at most log2(n) rounds. The edge scan of a round is
+    split into contiguous edge partitions handled by worker processes. The edge arrays
+    and the vertex -> component labels live in shared memory, and each worker sends back
+    only the cheapest edge of each component its partition touches, so nothing 
+    proportional to the graph size is pickled between processes.
+
+    Edges are pre-sorted by (weight, edge order), which makes an edge's position its
+    rank. Ties are therefore broken consistently and the chosen edges never form a cycle.
+"""
+
+import os
+from multiprocessing import Pool, shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+
+from hw3_q8 import CsrGraph, UnionFind
+
+
+_NO_EDGE = np.iinfo(np.int64).max
+
+# Views onto the shared blocks, set per worker process by _attach
+_shared: Dict[str, np.ndarray] = {}
+_shared_blocks = []
+
+
+def _attach(specs: Dict[str, Tuple[str, tuple, str]]):
+    for key, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        _shared[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _cheapest_outgoing(lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(components, ranks): the lowest-ranked edge in [lo, hi) leaving each component it touches."""
+    component = _shared['component']
+    cu = component[_shared['src'][lo:hi]]
+    cv = component[_shared['dst'][lo:hi]]
+    crossing = np.flatnonzero(cu != cv)
+
+    # Both endpoints of each crossing edge, in rank order, so the first time a component
+    # appears is its cheapest edge
+    ends = np.stack([cu[crossing], cv[crossing]], axis=1).ravel()
+    components, first = np.unique(ends, return_index=True)
+    return components, crossing[first // 2] + lo
+
+
+def boruvka_find_mst(graph: CsrGraph, workers: int = None):
+    """Yield the (from, to, dist) edges of a minimum spanning forest using parallel Borůvka.
+
+    Args:
+        graph (CsrGraph): Graph from read_data_csr (or CsrGraph.from_edges).
+        workers (int, optional): Worker processes scanning edge partitions. 1 scans
+            in-process without a pool. Defaults to os.cpu_count().
+
+    With distinct edge weights this is the same (unique) tree prims_find_mst returns;
+    edges are yielded round by round rather than in Prim order.
+    """
+    workers = workers or os.cpu_count() or 1
+    n = graph.vertex_count
+
+    src, dst, weights = graph.edges()
+    order = np.argsort(weights, kind='stable')
+    arrays = {
+        'src': src[order].astype(np.int64),
+        'dst': dst[order].astype(np.int64),
+        'component': np.arange(n, dtype=np.int64),
+    }
+    weights = weights[order]
+    m = len(arrays['src'])
+    bounds = np.linspace(0, m, workers + 1).astype(np.int64).tolist()
+    tasks = [(bounds[k], bounds[k + 1]) for k in range(workers)]
+    best = np.empty(n, dtype=np.int64)
+
+    blocks = []
+    views: Dict[str, np.ndarray] = {}
+    pool = None
+    try:
+        specs = {}
+        for key, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            views[key] = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            views[key][...] = array
+            specs[key] = (block.name, array.shape, array.dtype.str)
+        arrays.clear()
+
+        if workers > 1:
+            pool = Pool(workers, initializer=_attach, initargs=(specs,))
+        else:
+            _shared.update(views)
+
+        components = UnionFind(n)
+        remaining = n - 1
+        while remaining > 0:
+            if pool is None:
+                partials = [_cheapest_outgoing(*task) for task in tasks]
+            else:
+                partials = pool.starmap(_cheapest_outgoing, tasks)
+
+            # Reduced in partition order, so the result does not depend on worker timing
+            best.fill(_NO_EDGE)
+            for components_touched, ranks in partials:
+                np.minimum.at(best, components_touched, ranks)
+            chosen = np.unique(best[best != _NO_EDGE])
+            if len(chosen) == 0:
+                # Every remaining component is isolated: the forest is complete
+                break
+
+            for rank, a, b in zip(chosen.tolist(), views['src'][chosen].tolist(), views['dst'][chosen].tolist()):
+                if components.union(a, b):
+                    remaining -= 1
+                    yield graph.names[a], graph.names[b], weights[rank].item()
+
+            labels = np.unique(views['component'])
+            roots = np.array([components.find(label) for label in labels.tolist()], dtype=np.int64)
+            views['component'][:] = roots[np.searchsorted(labels, views['component'])]
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        # Views must be released before their blocks can be closed
+        _shared.clear()
+        views.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+if __name__ == "__main__":
+    import time
+
+    from hw3_q8 import prims_find_mst
+
+    n_vertices = 200_000
+    n_edges = 2_000_000
+
+    # Random connected graph with distinct weights, so the MST is unique
+    rng = np.random.default_rng(103)
+    src = np.concatenate([np.arange(1, n_vertices), rng.integers(0, n_vertices, n_edges - n_vertices + 1)])
+    dst = np.concatenate([
+        (rng.random(n_vertices - 1) * np.arange(1, n_vertices)).astype(np.int64),
+        rng.integers(0, n_vertices, n_edges - n_vertices + 1),
+    ])
+    weights = rng.permutation(n_edges).astype(np.float64) + 1
+    graph = CsrGraph.from_edges([f'City {i}' for i in range(n_vertices)], src, dst, weights)
+
+    print()
+    print(f'{graph.vertex_count} vertices, {graph.edge_count} edges')
+
+    start = time.perf_counter()
+    expected = {frozenset(edge[:2]) for edge in prims_find_mst(graph, engine='kruskal')}
+    print(f'\tKruskal (sequential): {time.perf_counter() - start:.2f}s')
+
+    baseline = None
+    cpu_count = os.cpu_count() or 1
+    for workers in [w for w in (1, 2, 4, 8, 16, 32) if w < cpu_count] + [cpu_count]:
+        start = time.perf_counter()
+        tree = {frozenset(edge[:2]) for edge in boruvka_find_mst(graph, workers=workers)}
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'\tBorůvka, {workers:2} worker(s): {elapsed:.2f}s  speedup={baseline / elapsed:.2f}x  same tree={tree == expected}')
+    print()
@@ -0,0 +1,284 @@
+"""
+    Incremental minimum spanning forest maintenance on top of the hw3_q8 graph loaders.
+
+    Road distances change over the day, so instead of re-running prims_find_mst after
+    every closure or detour, DynamicMst repairs the current tree locally:
+
+    - inserting an edge (or lowering a weight) applies the cycle property: the new edge
+      replaces the heaviest edge on the tree path between its endpoints if it is lighter;
+    - deleting a tree edge (or raising its weight) splits a tree in two and searches the
+      smaller side for the lightest non-tree edge reconnecting it.
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from hw3_q8 import CsrGraph, UnionFind
+
+
+MstChange = namedtuple('MstChange', ['added', 'removed'])
+MstChange.__doc__ = "Tree edges (from, to, dist) that entered and left the spanning forest."
+
+
+def _key(a: int, b: int) -> Tuple[int, int]:
+    return (a, b) if a < b else (b, a)
+
+
+class DynamicMst:
+    """Minimum spanning forest that supports edge insertions, deletions and weight updates.
+
+    Vertices are addressed by name, as in the (from, to, dist) tuples of prims_find_mst.
+    Parallel edges are collapsed to the lightest one.
+    """
+
+    def __init__(self, graph: CsrGraph):
+        self.names: List[str] = list(graph.names)
+        self.index: Dict[str, int] = dict(graph.index)
+
+        # Full graph (both directions) and the tree subset of it
+        self.adjacency: List[Dict[int, float]] = [{} for _ in self.names]
+        self.tree_adjacency: List[Dict[int, float]] = [{} for _ in self.names]
+
+        src, dst, weights = graph.edges()
+        for a, b, dist in zip(src.tolist(), dst.tolist(), weights.tolist()):
+            if b not in self.adjacency[a] or dist < self.adjacency[a][b]:
+                self.adjacency[a][b] = dist
+                self.adjacency[b][a] = dist
+
+        edges = sorted(
+            (dist, a, b)
+            for a, neighbors in enumerate(self.adjacency)
+            for b, dist in neighbors.items()
+            if a < b
+        )
+        components = UnionFind(len(self.names))
+        for dist, a, b in edges:
+            if components.union(a, b):
+                self._link(a, b, dist)
+
+    @property
+    def total_weight(self) -> float:
+        return sum(
+            dist
+            for a, neighbors in enumerate(self.tree_adjacency)
+            for b, dist in neighbors.items()
+            if a < b
+        )
+
+    def edges(self):
+        """Yield the (from, to, dist) edges of the current spanning forest."""
+        for a, neighbors in enumerate(self.tree_adjacency):
+            for b, dist in neighbors.items():
+                if a < b:
+                    yield self.names[a], self.names[b], dist
+
+    def insert_edge(self, start: str, end: str, dist: float) -> MstChange:
+        """Add a road. If the pair is already connected the call behaves like update_weight."""
+        a, b = self._vertex(start), self._vertex(end)
+        if a == b:
+            return MstChange([], [])
+        if b in self.adjacency[a]:
+            return self.update_weight(start, end, dist)
+
+        self.adjacency[a][b] = dist
+        self.adjacency[b][a] = dist
+        return self._offer_edge(a, b, dist)
+
+    def delete_edge(self, start: str, end: str) -> MstChange:
+        """Remove a road. Raises KeyError if it does not exist."""
+        a, b = self.index[start], self.index[end]
+        dist = self.adjacency[a].pop(b)
+        del self.adjacency[b][a]
+
+        if b not in self.tree_adjacency[a]:
+            return MstChange([], [])
+
+        self._cut(a, b)
+        removed = [(self.names[a], self.names[b], dist)]
+        replacement = self._lightest_reconnecting_edge(a, b)
+        if replacement is None:
+            return MstChange([], removed)
+
+        self._link(*replacement)
+        return MstChange([self._named(*replacement)], removed)
+
+    def update_weight(self, start: str, end: str, dist: float) -> MstChange:
+        """Change the length of an existing road. Raises KeyError if it does not exist."""
+        a, b = self.index[start], self.index[end]
+        old_dist = self.adjacency[a][b]
+        self.adjacency[a][b] = dist
+        self.adjacency[b][a] = dist
+        in_tree = b in self.tree_adjacency[a]
+
+        if in_tree and dist <= old_dist:
+            # A tree edge getting lighter stays the best way across its cut
+            self.tree_adjacency[a][b] = dist
+            self.tree_adjacency[b][a] = dist
+            return MstChange([], [])
+        elif in_tree:
+            self._cut(a, b)
+            replacement = self._lightest_reconnecting_edge(a, b)
+            self._link(*replacement)
+            if _key(replacement[0], replacement[1]) == _key(a, b):
+                return MstChange([], [])
+            return MstChange([self._named(*replacement)], [(self.names[a], self.names[b], old_dist)])
+        elif dist < old_dist:
+            return self._offer_edge(a, b, dist)
+        return MstChange([], [])
+
+    def _vertex(self, name: str) -> int:
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.adjacency.append({})
+            self.tree_adjacency.append({})
+        return self.index[name]
+
+    def _named(self, a: int, b: int, dist: float):
+        return self.names[a], self.names[b], dist
+
+    def _link(self, a: int, b: int, dist: float):
+        self.tree_adjacency[a][b] = dist
+        self.tree_adjacency[b][a] = dist
+
+    def _cut(self, a: int, b: int):
+        del self.tree_adjacency[a][b]
+        del self.tree_adjacency[b][a]
+
+    def _tree_path(self, a: int, b: int) -> Optional[List[int]]:
+        """Vertices on the tree path from a to b, or None if they are in different trees."""
+        parent = {a: a}
+        stack = [a]
+        while stack:
+            v = stack.pop()
+            if v == b:
+                path = [b]
+                while path[-1] != a:
+                    path.append(parent[path[-1]])
+                return path
+            for u in self.tree_adjacency[v]:
+                if u not in parent:
+                    parent[u] = v
+                    stack.append(u)
+        return None
+
+    def _offer_edge(self, a: int, b: int, dist: float) -> MstChange:
+        """Cycle property: swap (a, b) in for the heaviest edge on its tree cycle if lighter."""
+        path = self._tree_path(a, b)
+        if path is None:
+            self._link(a, b, dist)
+            return MstChange([self._named(a, b, dist)], [])
+
+        heaviest = max(
+            ((self.tree_adjacency[u][v], u, v) for u, v in zip(path, path[1:])),
+            key=lambda edge: edge[0],
+        )
+        if heaviest[0] <= dist:
+            return MstChange([], [])
+
+        heaviest_dist, u, v = heaviest
+        self._cut(u, v)
+        self._link(a, b, dist)
+        return MstChange([self._named(a, b, dist)], [self._named(u, v, heaviest_dist)])
+
+    def _lightest_reconnecting_edge(self, a: int, b: int) -> Optional[Tuple[int, int, float]]:
+        """After cutting tree edge (a, b), find the lightest graph edge joining the two sides."""
+        # Grow both sides in lockstep and scan whichever finishes first (the smaller one)
+        sides = [{a}, {b}]
+        stacks = [[a], [b]]
+        while stacks[0] and stacks[1]:
+            for side, stack in zip(sides, stacks):
+                v = stack.pop()
+                for u in self.tree_adjacency[v]:
+                    if u not in side:
+                        side.add(u)
+                        stack.append(u)
+        smaller = sides[0] if not stacks[0] else sides[1]
+
+        best = None
+        for v in smaller:
+            for u, dist in self.adjacency[v].items():
+                if u not in smaller and (best is None or dist < best[2]):
+                    best = (v, u, dist)
+        return best
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    import numpy as np
+
+    from hw3_q8 import prims_find_mst
+
+    rng = random.Random(103)
+    n_vertices = 2000
+    n_edges = 10000
+    n_updates = 500
+
+    names = [f'City {i}' for i in range(n_vertices)]
+    roads = {}
+    for i in range(1, n_vertices):
+        roads[_key(i, rng.randrange(i))] = float(rng.randint(1, 1000))
+    while len(roads) < n_edges:
+        a, b = rng.sample(range(n_vertices), 2)
+        roads[_key(a, b)] = float(rng.randint(1, 1000))
+
+    def build_graph():
+        (src, dst), weights = zip(*roads.keys()), list(roads.values())
+        return CsrGraph.from_edges(names, src, dst, weights)
+
+    mst = DynamicMst(build_graph())
+
+    operations = []
+    for _ in range(n_updates):
+        kind = rng.choice(['insert', 'delete', 'update'])
+        if kind == 'insert':
+            a, b = rng.sample(range(n_vertices), 2)
+            if _key(a, b) in roads:
+                continue
+            operations.append(('insert', _key(a, b), float(rng.randint(1, 1000))))
+            roads[_key(a, b)] = operations[-1][2]
+        elif kind == 'delete':
+            edge = rng.choice(list(roads))
+            operations.append(('delete', edge, None))
+            del roads[edge]
+        else:
+            edge = rng.choice(list(roads))
+            operations.append(('update', edge, float(rng.randint(1, 1000))))
+            roads[edge] = operations[-1][2]
+
+    incremental_time = 0.0
+    changed_edges = 0
+    for kind, (a, b), dist in operations:
+        start = time.perf_counter()
+        if kind == 'insert':
+            change = mst.insert_edge(names[a], names[b], dist)
+        elif kind == 'delete':
+            change = mst.delete_edge(names[a], names[b])
+        else:
+            change = mst.update_weight(names[a], names[b], dist)
+        incremental_time += time.perf_counter() - start
+        changed_edges += len(change.added) + len(change.removed)
+
+    src, dst, weights = [], [], []
+    for a, neighbors in enumerate(mst.adjacency):
+        for b, dist in neighbors.items():
+            if a < b:
+                src.append(a)
+                dst.append(b)
+                weights.append(dist)
+    final_graph = CsrGraph.from_edges(names, src, dst, weights)
+
+    start = time.perf_counter()
+    for _ in range(10):
+        expected_weight = sum(dist for _, _, dist in prims_find_mst(final_graph, engine='kruskal'))
+    recompute_time = (time.perf_counter() - start) / 10
+
+    print()
+    print(f'{n_vertices} vertices, {n_edges} edges, {len(operations)} updates ({changed_edges} tree edge changes)')
+    print(f'\tIncremental:           {1e6 * incremental_time / len(operations):8.1f} us/update')
+    print(f'\tFull recompute:        {1e6 * recompute_time:8.1f} us/update')
+    print(f'\tSpeedup:               {recompute_time * len(operations) / incremental_time:8.1f}x')
+    print(f'\tForest weight matches: {np.isclose(mst.total_weight, expected_weight)}')
+    print()
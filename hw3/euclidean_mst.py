@@ -0,0 +1,143 @@
+"""
+    Euclidean MST for cities given as coordinates instead of explicit arcs.
+
+    Building the complete graph for prims_find_mst costs O(n²) edges. The Euclidean MST
+    is a subgraph of the Delaunay triangulation, which has O(n) edges in the plane, so
+    triangulating first and running Kruskal on the triangulation edges is exact and takes
+    about O(n log n). For higher dimensions, where triangulations grow quickly, a
+    k-nearest-neighbor candidate graph from a k-d tree is available as an approximate mode.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from scipy.spatial import Delaunay, QhullError, cKDTree
+
+from hw3_q8 import CsrGraph, UnionFind, prims_find_mst
+
+
+def read_points(path: str) -> Tuple[List[str], np.ndarray]:
+    """Read 'name, x, y[, z ...]' lines (blank lines and '#' comments skipped)."""
+    names = []
+    points = []
+    with open(path, 'r') as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+
+            components = [c.strip() for c in line.split(',')]
+            if len(components) < 2:
+                raise ValueError(f"Invalid Line (Line {i+1}): {line}")
+            try:
+                coordinates = [float(c) for c in components[1:]]
+            except ValueError:
+                raise ValueError(f"Invalid coordinates on line {i+1}: {line}")
+            if points and len(coordinates) != len(points[0]):
+                raise ValueError(f"Expected {len(points[0])} coordinates on line {i+1}: {line}")
+
+            names.append(components[0])
+            points.append(coordinates)
+
+    return names, np.array(points, dtype=np.float64).reshape(len(points), -1)
+
+
+def _delaunay_candidates(points: np.ndarray) -> np.ndarray:
+    if len(points) < points.shape[1] + 2:
+        # Too few points to triangulate: every pair is a candidate
+        return np.array([(a, b) for a in range(len(points)) for b in range(a + 1, len(points))],
+                        dtype=np.int64).reshape(-1, 2)
+    if points.shape[1] == 1:
+        order = np.argsort(points[:, 0], kind='stable')
+        return np.stack([order[:-1], order[1:]], axis=1)
+
+    try:
+        simplices = Delaunay(points).simplices
+    except QhullError:
+        # Degenerate input (e.g. all cities on a line): joggle the points slightly
+        simplices = Delaunay(points, qhull_options='QJ').simplices
+
+    corners = simplices.shape[1]
+    pairs = np.concatenate([
+        simplices[:, [i, j]] for i in range(corners) for j in range(i + 1, corners)
+    ])
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def _knn_candidates(points: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(points) - 1)
+    _, neighbors = cKDTree(points).query(points, k=k + 1)
+    pairs = np.stack([np.repeat(np.arange(len(points)), k), neighbors[:, 1:].ravel()], axis=1)
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def euclidean_find_mst(names: List[str], points: np.ndarray, method: str = 'delaunay', k: int = 8):
+    """Yield the (from, to, dist) edges of the Euclidean MST of the given cities.
+
+    Args:
+        names (List[str]): City names.
+        points (np.ndarray): Coordinates, shape (len(names), dimensions).
+        method (str, optional): 'delaunay' (exact) or 'knn' (k nearest neighbors per city;
+            approximate, k is doubled until the candidate graph is connected).
+            Defaults to 'delaunay'.
+        k (int, optional): Initial neighbor count for 'knn'. Defaults to 8.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(len(names), -1)
+    if len(names) < 2:
+        return
+
+    # Coincident cities are joined to their first copy at distance 0 and triangulated once
+    unique_points, first_copy, copy_of = np.unique(points, axis=0, return_index=True, return_inverse=True)
+    copy_of = copy_of.ravel()
+    duplicates = np.flatnonzero(first_copy[copy_of] != np.arange(len(names)))
+    for v in duplicates.tolist():
+        yield names[first_copy[copy_of[v]]], names[v], 0.0
+
+    if method == 'delaunay':
+        pairs = _delaunay_candidates(unique_points)
+    elif method == 'knn':
+        while True:
+            pairs = _knn_candidates(unique_points, k)
+            components = UnionFind(len(unique_points))
+            joined = sum(components.union(a, b) for a, b in pairs.tolist())
+            if joined == len(unique_points) - 1 or k >= len(unique_points) - 1:
+                break
+            k *= 2
+    else:
+        raise ValueError(f"Unknown method: {method} (expected 'delaunay' or 'knn')")
+
+    if len(pairs) == 0:
+        return
+    vertices = first_copy[pairs]
+    lengths = np.linalg.norm(points[vertices[:, 0]] - points[vertices[:, 1]], axis=1)
+    graph = CsrGraph.from_edges(names, vertices[:, 0], vertices[:, 1], lengths)
+    yield from prims_find_mst(graph, engine='kruskal')
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(103)
+
+    # Exactness check against the complete graph on a small instance
+    n_small = 400
+    points = rng.random((n_small, 2)) * 1000
+    names = [f'City {i}' for i in range(n_small)]
+    a, b = np.triu_indices(n_small, 1)
+    complete = CsrGraph.from_edges(names, a, b, np.linalg.norm(points[a] - points[b], axis=1))
+    expected = sum(dist for _, _, dist in prims_find_mst(complete, engine='kruskal'))
+    delaunay = sum(dist for _, _, dist in euclidean_find_mst(names, points))
+
+    print()
+    print(f'{n_small} cities: complete graph {expected:.3f} mi, Delaunay {delaunay:.3f} mi')
+
+    n_large = 100_000
+    points = rng.random((n_large, 2)) * 1000
+    names = [f'City {i}' for i in range(n_large)]
+    for method in ('delaunay', 'knn'):
+        start = time.perf_counter()
+        total = sum(dist for _, _, dist in euclidean_find_mst(names, points, method=method))
+        print(f'{n_large} cities ({method}): {total:.3f} mi in {time.perf_counter() - start:.2f}s')
+    print()
@@ -1,10 +1,19 @@
-from typing import Dict, Set, Tuple, List
+import hashlib
+import heapq
+import json
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple, List, Union
 
+import numpy as np
 
-def read_data(path: str='hw3/q8-data.txt'):
+
+def _parse_graph_file(path: str) -> Iterator[tuple]:
+    """Yield (name,) for each vertex declaration and (start, end, dist) for each arc."""
     vertices = set()
-    adjacency_lists = {}
-    edge_count = 0
 
     with open(path, 'r') as f:
         for i, line in enumerate(f):
@@ -18,6 +27,7 @@ def read_data(path: str='hw3/q8-data.txt'):
             components = [c.strip() for c in components]
             if len(components) == 1:
                 vertices.add(components[0])
+                yield (components[0],)
             elif len(components) == 3:
                 
                 start, end, dist = components
@@ -28,52 +38,506 @@ def read_data(path: str='hw3/q8-data.txt'):
                     raise ValueError(f"Invalid line {i}: {end} not declared as a vertex")
 
                 if (dist.endswith("mi")) and dist[:-2].isdigit():
-                    dist = float(dist[:-2])
-
-                    if not start in adjacency_lists:
-                        adjacency_lists[start] = [(end, dist)]
-                    adjacency_lists[start].append((end, dist))
-
-                    if not end in adjacency_lists:
-                        adjacency_lists[end] = [(start, dist)]
-                    adjacency_lists[end].append((start, dist))
-
-                    edge_count += 1
+                    yield start, end, float(dist[:-2])
                 else:
                     raise ValueError(f"Invalid distance: {dist} on line {i+1}")
             
             else:
                 raise ValueError(f"Invalid Line (Line {i+1}): {line}")
+
+
+def read_data(path: str='hw3/q8-data.txt'):
+    vertices = set()
+    adjacency_lists = {}
+    edge_count = 0
+
+    for record in _parse_graph_file(path):
+        if len(record) == 1:
+            vertices.add(record[0])
+            continue
+
+        start, end, dist = record
+        adjacency_lists.setdefault(start, []).append((end, dist))
+        adjacency_lists.setdefault(end, []).append((start, dist))
+        edge_count += 1
     
     return vertices, adjacency_lists, edge_count
 
-def prims_find_mst(vertices: Set[str], adjacency_lists: Dict[str, List[Tuple[str, float]]]):
 
-    from queue import PriorityQueue
+class CsrGraph:
+    """Undirected graph with integer vertex IDs and compressed sparse row adjacency.
+
+    The neighbors (and matching weights) of vertex v are
+    neighbors[offsets[v]:offsets[v+1]]; every edge is stored once in each direction.
+    names[v] is the city name of vertex v.
+    """
+
+    def __init__(self, names: List[str], offsets: np.ndarray, neighbors: np.ndarray, weights: np.ndarray):
+        self.names = names
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self._index = None
+
+    @classmethod
+    def from_edges(cls, names: List[str], src, dst, weights, dtype=np.float64) -> 'CsrGraph':
+        """Build from parallel arrays of undirected edges (each listed once)."""
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        weights = np.asarray(weights, dtype=dtype)
+
+        both_src = np.concatenate([src, dst])
+        both_dst = np.concatenate([dst, src])
+        both_weights = np.concatenate([weights, weights])
+
+        order = np.argsort(both_src, kind='stable')
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(both_src, minlength=len(names)), out=offsets[1:])
+
+        id_dtype = np.int32 if len(names) < 2**31 else np.int64
+        return cls(names, offsets, both_dst[order].astype(id_dtype), both_weights[order])
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.neighbors) // 2
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """Name -> vertex ID lookup, built on first use."""
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self.names)}
+        return self._index
+
+    def degree(self, v: int) -> int:
+        return int(self.offsets[v + 1] - self.offsets[v])
+
+    def adjacent(self, v: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbor IDs, weights) of vertex v, as array views."""
+        lo, hi = self.offsets[v], self.offsets[v + 1]
+        return self.neighbors[lo:hi], self.weights[lo:hi]
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(src, dst, weight) arrays with each undirected edge once (src < dst; self loops dropped)."""
+        src = np.repeat(np.arange(self.vertex_count, dtype=self.neighbors.dtype), np.diff(self.offsets))
+        keep = src < self.neighbors
+        return src[keep], self.neighbors[keep], self.weights[keep]
+
+
+GRAPH_CACHE_VERSION = 1
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _graph_cache_dir(path: str) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + '.csrcache')
+
+
+def _read_graph_cache(path: str, dtype, verify_hash: bool) -> Optional[CsrGraph]:
+    cache_dir = _graph_cache_dir(path)
+    try:
+        with open(cache_dir / 'meta.json', 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    stat = os.stat(path)
+    if (
+        meta.get('version') != GRAPH_CACHE_VERSION
+        or meta.get('dtype') != np.dtype(dtype).str
+        or meta.get('mtime_ns') != stat.st_mtime_ns
+        or meta.get('size') != stat.st_size
+    ):
+        return None
+    if verify_hash and meta.get('sha256') != _file_sha256(path):
+        return None
+
+    with open(cache_dir / 'names.txt', 'r', encoding='utf-8') as f:
+        names = f.read().split('\n') if meta['vertex_count'] > 0 else []
+    return CsrGraph(
+        names,
+        np.load(cache_dir / 'offsets.npy', mmap_mode='r'),
+        np.load(cache_dir / 'neighbors.npy', mmap_mode='r'),
+        np.load(cache_dir / 'weights.npy', mmap_mode='r'),
+    )
+
+
+def _write_graph_cache(path: str, graph: CsrGraph, stat: os.stat_result, sha256: str):
+    cache_dir = _graph_cache_dir(path)
+
+    # Build next to the final location and swap in, so readers never see a partial cache
+    staging_dir = None
+    try:
+        staging_dir = Path(tempfile.mkdtemp(prefix=cache_dir.name + '.', dir=cache_dir.parent))
+        with open(staging_dir / 'names.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(graph.names))
+        np.save(staging_dir / 'offsets.npy', graph.offsets)
+        np.save(staging_dir / 'neighbors.npy', graph.neighbors)
+        np.save(staging_dir / 'weights.npy', graph.weights)
+        with open(staging_dir / 'meta.json', 'w') as f:
+            json.dump({
+                'version': GRAPH_CACHE_VERSION,
+                'dtype': graph.weights.dtype.str,
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': sha256,
+                'vertex_count': graph.vertex_count,
+                'edge_count': graph.edge_count,
+            }, f)
+
+        if cache_dir.exists():
+            shutil.rmtree(cache_dir)
+        os.replace(staging_dir, cache_dir)
+    except OSError:
+        # Caching is best-effort (e.g. read-only data directory)
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def read_data_csr(
+    path: str='hw3/q8-data.txt',
+    dtype=np.float64,
+    cache: bool=False,
+    verify_hash: bool=False,
+) -> CsrGraph:
+    """Load a graph file as a CsrGraph. Vertex IDs follow declaration order.
+
+    Args:
+        path (str, optional): Path of the graph file. Defaults to 'hw3/q8-data.txt'.
+        dtype (optional): Weight dtype, np.float32 halves weight storage. Defaults to np.float64.
+        cache (bool, optional): Keep a compiled copy in a '<path>.csrcache' directory next to
+            the file and memory-map it on later loads. The cache is rebuilt whenever the
+            file's mtime or size changes. Defaults to False.
+        verify_hash (bool, optional): Also compare the file's SHA-256 against the cached
+            one before trusting the cache. Defaults to False.
+    """
+    if cache:
+        graph = _read_graph_cache(path, dtype, verify_hash)
+        if graph is not None:
+            return graph
+        stat = os.stat(path)
+        sha256 = _file_sha256(path)
+
+    names = []
+    index = {}
+    src = []
+    dst = []
+    weights = []
+
+    for record in _parse_graph_file(path):
+        if len(record) == 1:
+            if record[0] not in index:
+                index[record[0]] = len(names)
+                names.append(record[0])
+            continue
+
+        start, end, dist = record
+        src.append(index[start])
+        dst.append(index[end])
+        weights.append(dist)
+
+    graph = CsrGraph.from_edges(names, src, dst, weights, dtype=dtype)
+    graph._index = index
+
+    if cache:
+        _write_graph_cache(path, graph, stat, sha256)
+    return graph
+
 
-    # pick a random vertex to start with
-    start_vertex = next(iter(vertices)) 
-    mst_vertices = set([start_vertex])
+MST_ENGINES = ('lazy', 'indexed', 'kruskal')
 
-    # We'll create a priority queue to store the edges that go 
-    # outward from current set
-    candidate_edges = PriorityQueue()
-    for neighbor_vertex, dist in adjacency_lists[start_vertex]:
-        candidate_edges.put((dist, start_vertex, neighbor_vertex))
 
-    vertices_added = 1
-    while vertices_added < len(vertices) and not candidate_edges.empty():
-        dist, from_v, to_v = candidate_edges.get()
+class UnionFind:
+    """Disjoint-set forest with path compression (halving) and union by size."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, a: int) -> int:
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the sets containing a and b. Returns False if they were already joined."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return True
+
+
+class IndexedMinHeap:
+    """Binary min-heap over keys 0..n-1 supporting O(log n) decrease-key."""
+
+    def __init__(self, n: int):
+        self.heap: List[int] = []
+        self.position = [-1] * n
+        self.priority = [math.inf] * n
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key: int):
+        return self.position[key] != -1
+
+    def push_or_decrease(self, key: int, priority: float) -> bool:
+        """Insert key, or lower its priority. Returns True if the heap changed."""
+        if self.position[key] == -1:
+            self.priority[key] = priority
+            self.position[key] = len(self.heap)
+            self.heap.append(key)
+        elif priority < self.priority[key]:
+            self.priority[key] = priority
+        else:
+            return False
+        self._sift_up(self.position[key])
+        return True
+
+    def pop(self) -> Tuple[int, float]:
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.position[top] = -1
+        if heap:
+            heap[0] = last
+            self.position[last] = 0
+            self._sift_down(0)
+        return top, self.priority[top]
+
+    def _sift_up(self, i: int):
+        heap, position, priority = self.heap, self.position, self.priority
+        key = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if priority[heap[parent]] <= priority[key]:
+                break
+            heap[i] = heap[parent]
+            position[heap[i]] = i
+            i = parent
+        heap[i] = key
+        position[key] = i
+
+    def _sift_down(self, i: int):
+        heap, position, priority = self.heap, self.position, self.priority
+        n = len(heap)
+        key = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and priority[heap[child + 1]] < priority[heap[child]]:
+                child += 1
+            if priority[key] <= priority[heap[child]]:
+                break
+            heap[i] = heap[child]
+            position[heap[i]] = i
+            i = child
+        heap[i] = key
+        position[key] = i
+
+
+def _lazy_prims(vertices: Set[str], adjacency_lists: Dict[str, List[Tuple[str, float]]]):
+    mst_vertices = set()
+
+    # Each pass grows one tree of the forest; a connected graph needs one pass
+    for start_vertex in vertices:
+        if start_vertex in mst_vertices:
+            continue
+        mst_vertices.add(start_vertex)
+
+        # Stale entries (whose endpoint joined the tree since being pushed)
+        # are discarded when popped rather than searched for and removed.
+        candidate_edges = [
+            (dist, start_vertex, neighbor_vertex)
+            for neighbor_vertex, dist in adjacency_lists.get(start_vertex, ())
+        ]
+        heapq.heapify(candidate_edges)
+
+        while candidate_edges:
+            dist, from_v, to_v = heapq.heappop(candidate_edges)
+            if to_v in mst_vertices:
+                continue
 
-        if to_v not in mst_vertices:
             mst_vertices.add(to_v)
-            vertices_added += 1
             yield from_v, to_v, dist
 
-            # Fill the candidate edges queue with edges from the new node
-            for neighbor_vertex, dist in adjacency_lists[to_v]:
+            for neighbor_vertex, neighbor_dist in adjacency_lists.get(to_v, ()):
                 if neighbor_vertex not in mst_vertices:
-                    candidate_edges.put((dist, to_v, neighbor_vertex))
+                    heapq.heappush(candidate_edges, (neighbor_dist, to_v, neighbor_vertex))
+
+
+def _indexed_prims(vertices: Set[str], adjacency_lists: Dict[str, List[Tuple[str, float]]]):
+    names = list(vertices)
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+
+    in_tree = [False] * n
+    best_from = [-1] * n
+    frontier = IndexedMinHeap(n)
+
+    for start in range(n):
+        if in_tree[start]:
+            continue
+        frontier.push_or_decrease(start, 0.0)
+
+        while frontier:
+            v, dist = frontier.pop()
+            in_tree[v] = True
+            if best_from[v] != -1:
+                yield names[best_from[v]], names[v], dist
+
+            for neighbor_vertex, neighbor_dist in adjacency_lists.get(names[v], ()):
+                u = index[neighbor_vertex]
+                if not in_tree[u] and frontier.push_or_decrease(u, neighbor_dist):
+                    best_from[u] = v
+
+
+def _kruskal(vertices: Set[str], adjacency_lists: Dict[str, List[Tuple[str, float]]]):
+    names = list(vertices)
+    index = {name: i for i, name in enumerate(names)}
+
+    # Adjacency lists hold each edge in both directions; keep one copy
+    edges = [
+        (dist, index[from_v], index[to_v])
+        for from_v, neighbors in adjacency_lists.items()
+        for to_v, dist in neighbors
+        if from_v < to_v
+    ]
+    edges.sort()
+
+    components = UnionFind(len(names))
+    remaining = len(names) - 1
+    for dist, a, b in edges:
+        if remaining == 0:
+            break
+        if components.union(a, b):
+            remaining -= 1
+            yield names[a], names[b], dist
+
+
+def _lazy_prims_csr(graph: CsrGraph):
+    names = graph.names
+    offsets = graph.offsets.tolist()
+    neighbors, weights = graph.neighbors, graph.weights
+    in_tree = bytearray(graph.vertex_count)
+
+    for start in range(graph.vertex_count):
+        if in_tree[start]:
+            continue
+        in_tree[start] = 1
+
+        lo, hi = offsets[start], offsets[start + 1]
+        candidate_edges = [
+            (dist, start, neighbor)
+            for dist, neighbor in zip(weights[lo:hi].tolist(), neighbors[lo:hi].tolist())
+        ]
+        heapq.heapify(candidate_edges)
+
+        while candidate_edges:
+            dist, from_v, to_v = heapq.heappop(candidate_edges)
+            if in_tree[to_v]:
+                continue
+
+            in_tree[to_v] = 1
+            yield names[from_v], names[to_v], dist
+
+            lo, hi = offsets[to_v], offsets[to_v + 1]
+            for neighbor_dist, neighbor in zip(weights[lo:hi].tolist(), neighbors[lo:hi].tolist()):
+                if not in_tree[neighbor]:
+                    heapq.heappush(candidate_edges, (neighbor_dist, to_v, neighbor))
+
+
+def _indexed_prims_csr(graph: CsrGraph):
+    names = graph.names
+    offsets = graph.offsets.tolist()
+    neighbors, weights = graph.neighbors, graph.weights
+    n = graph.vertex_count
+
+    in_tree = bytearray(n)
+    best_from = [-1] * n
+    frontier = IndexedMinHeap(n)
+
+    for start in range(n):
+        if in_tree[start]:
+            continue
+        frontier.push_or_decrease(start, 0.0)
+
+        while frontier:
+            v, dist = frontier.pop()
+            in_tree[v] = 1
+            if best_from[v] != -1:
+                yield names[best_from[v]], names[v], dist
+
+            lo, hi = offsets[v], offsets[v + 1]
+            for neighbor_dist, u in zip(weights[lo:hi].tolist(), neighbors[lo:hi].tolist()):
+                if not in_tree[u] and frontier.push_or_decrease(u, neighbor_dist):
+                    best_from[u] = v
+
+
+def _kruskal_csr(graph: CsrGraph):
+    names = graph.names
+    src, dst, weights = graph.edges()
+    order = np.argsort(weights, kind='stable')
+
+    components = UnionFind(graph.vertex_count)
+    remaining = graph.vertex_count - 1
+    for dist, a, b in zip(weights[order].tolist(), src[order].tolist(), dst[order].tolist()):
+        if remaining == 0:
+            break
+        if components.union(a, b):
+            remaining -= 1
+            yield names[a], names[b], dist
+
+
+def prims_find_mst(
+    vertices: Union[Set[str], CsrGraph],
+    adjacency_lists: Dict[str, List[Tuple[str, float]]] = None,
+    engine: str = 'lazy',
+):
+    """Yield the (from, to, dist) edges of a minimum spanning forest.
+
+    Args:
+        vertices (Union[Set[str], CsrGraph]): Vertex names, or a CsrGraph from 
+            read_data_csr (in which case adjacency_lists is not needed).
+        adjacency_lists (Dict[str, List[Tuple[str, float]]], optional): Outgoing (neighbor, dist)
+            pairs for each vertex, as returned by read_data.
+        engine (str, optional): 'lazy' (heapq Prim, stale entries skipped on pop),
+            'indexed' (Prim with an indexed decrease-key heap, at most one entry per
+            vertex) or 'kruskal' (sorted edges + union-find). Defaults to 'lazy'.
+
+    A disconnected graph yields a spanning tree for each of its components.
+    """
+    if isinstance(vertices, CsrGraph):
+        if engine == 'lazy':
+            return _lazy_prims_csr(vertices)
+        elif engine == 'indexed':
+            return _indexed_prims_csr(vertices)
+        elif engine == 'kruskal':
+            return _kruskal_csr(vertices)
+    elif engine == 'lazy':
+        return _lazy_prims(vertices, adjacency_lists)
+    elif engine == 'indexed':
+        return _indexed_prims(vertices, adjacency_lists)
+    elif engine == 'kruskal':
+        return _kruskal(vertices, adjacency_lists)
+    raise ValueError(f"Unknown MST engine: {engine} (expected one of {', '.join(MST_ENGINES)})")
 
 
 if __name__ == "__main__":
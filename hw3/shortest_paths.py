@@ -0,0 +1,220 @@
+"""
+    Point-to-point road distances over graphs loaded with hw3_q8.read_data_csr.
+
+    - dijkstra: plain Dijkstra that stops as soon as the target is settled.
+    - LandmarkIndex: ALT (A*, landmarks, triangle inequality) preprocessing. Distances
+      from a handful of far-apart landmarks give a lower bound on d(v, target), which
+      steers A* towards the target and settles only a small part of the graph.
+      The index can be saved next to the graph file and reloaded.
+    - DistanceOracle: answers queries by city name with an LRU cache in front.
+"""
+
+import hashlib
+import heapq
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from hw3_q8 import CsrGraph, read_data_csr
+
+
+def dijkstra(graph: CsrGraph, source: int, target: Optional[int] = None) -> Union[float, np.ndarray]:
+    """Shortest road distance(s) from vertex ID source.
+
+    Args:
+        graph (CsrGraph): Graph to search.
+        source (int): Start vertex ID.
+        target (int, optional): Stop once this vertex is settled and return its distance
+            (math.inf if unreachable). If omitted, return the array of distances to every vertex.
+    """
+    offsets = graph.offsets
+    neighbors, weights = graph.neighbors, graph.weights
+    dist = np.full(graph.vertex_count, math.inf)
+    settled = bytearray(graph.vertex_count)
+
+    dist[source] = 0.0
+    frontier = [(0.0, source)]
+    while frontier:
+        d, v = heapq.heappop(frontier)
+        if settled[v]:
+            continue
+        settled[v] = 1
+        if v == target:
+            return d
+
+        lo, hi = offsets[v], offsets[v + 1]
+        for u, w in zip(neighbors[lo:hi].tolist(), weights[lo:hi].tolist()):
+            candidate = d + w
+            if candidate < dist[u]:
+                dist[u] = candidate
+                heapq.heappush(frontier, (candidate, u))
+
+    return math.inf if target is not None else dist
+
+
+def _graph_fingerprint(graph: CsrGraph) -> str:
+    digest = hashlib.sha256()
+    for array in (graph.offsets, graph.neighbors, graph.weights):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class LandmarkIndex:
+    """ALT preprocessing: exact distances from each landmark to every vertex."""
+
+    def __init__(self, graph: CsrGraph, landmarks: np.ndarray, distances: np.ndarray):
+        self.graph = graph
+        self.landmarks = landmarks
+        # Shape (landmarks, vertices); unreachable entries are inf
+        self.distances = distances
+        # Vertex-major copy, so one vertex's landmark distances are contiguous
+        self.by_vertex = np.ascontiguousarray(distances.T)
+
+    @classmethod
+    def build(cls, graph: CsrGraph, n_landmarks: int = 8, seed: int = 0) -> 'LandmarkIndex':
+        """Pick landmarks by farthest-point selection, starting from a random vertex."""
+        n_landmarks = min(n_landmarks, graph.vertex_count)
+        rng = np.random.default_rng(seed)
+
+        landmarks = []
+        distances = []
+        closest = np.full(graph.vertex_count, math.inf)
+        next_landmark = int(rng.integers(graph.vertex_count))
+        for _ in range(n_landmarks):
+            landmarks.append(next_landmark)
+            distances.append(dijkstra(graph, next_landmark))
+            closest = np.minimum(closest, distances[-1])
+
+            # Prefer unreachable vertices (new component), then the farthest reachable one
+            candidates = np.where(np.isinf(closest), np.finfo(np.float64).max, closest)
+            candidates[landmarks] = -1
+            next_landmark = int(np.argmax(candidates))
+
+        return cls(graph, np.array(landmarks, dtype=np.int64), np.vstack(distances))
+
+    @staticmethod
+    def default_path(graph_path: str) -> Path:
+        graph_path = Path(graph_path)
+        return graph_path.with_name(graph_path.name + '.alt.npz')
+
+    def save(self, path: str):
+        np.savez(path, landmarks=self.landmarks, distances=self.distances,
+                 fingerprint=_graph_fingerprint(self.graph))
+
+    @classmethod
+    def load(cls, graph: CsrGraph, path: str) -> 'LandmarkIndex':
+        """Load a saved index. Raises ValueError if it was built for a different graph."""
+        with np.load(path) as data:
+            if str(data['fingerprint']) != _graph_fingerprint(graph):
+                raise ValueError(f"Landmark index {path} does not match the graph")
+            return cls(graph, data['landmarks'], data['distances'])
+
+    def query(self, source: int, target: int) -> float:
+        """A* search from source to target guided by the landmark bounds."""
+        if source == target:
+            return 0.0
+        to_target = self.distances[:, target]
+        from_source = self.distances[:, source]
+        if np.any(np.isinf(to_target) != np.isinf(from_source)):
+            # Some landmark reaches exactly one of the two: different components
+            return math.inf
+
+        graph = self.graph
+        offsets = graph.offsets
+        neighbors, weights = graph.neighbors, graph.weights
+        by_vertex = self.by_vertex
+        reachable = np.flatnonzero(~np.isinf(to_target))
+        # Landmarks that can't reach the target give no bound; select them per neighbor row
+        # rather than copying the whole vertex table
+        columns = None if len(reachable) == len(to_target) else reachable
+        to_target = to_target[reachable]
+
+        def potentials(vertices):
+            # Batched over a vertex's neighbors to keep the NumPy call count per expansion at one
+            if len(to_target) == 0:
+                return [0.0] * len(vertices)
+            rows = by_vertex[vertices]
+            if columns is not None:
+                rows = rows[:, columns]
+            return np.abs(rows - to_target).max(axis=1).tolist()
+
+        dist: Dict[int, float] = {source: 0.0}
+        settled = set()
+        frontier = [(potentials([source])[0], source)]
+        while frontier:
+            _, v = heapq.heappop(frontier)
+            if v in settled:
+                continue
+            settled.add(v)
+            if v == target:
+                return dist[v]
+
+            d = dist[v]
+            lo, hi = offsets[v], offsets[v + 1]
+            adjacent = neighbors[lo:hi]
+            for u, w, h in zip(adjacent.tolist(), weights[lo:hi].tolist(), potentials(adjacent)):
+                candidate = d + w
+                if candidate < dist.get(u, math.inf):
+                    dist[u] = candidate
+                    heapq.heappush(frontier, (candidate + h, u))
+
+        return math.inf
+
+
+class DistanceOracle:
+    """Road distance queries by city name, memoized in an LRU cache.
+
+    Args:
+        graph (CsrGraph): Graph to query.
+        index (LandmarkIndex, optional): Use ALT search instead of plain Dijkstra.
+        cache_size (int, optional): Number of (source, target) pairs to keep. Defaults to 4096.
+    """
+
+    def __init__(self, graph: CsrGraph, index: Optional[LandmarkIndex] = None, cache_size: int = 4096):
+        self.graph = graph
+        self.index = index
+        self.distance = lru_cache(maxsize=cache_size)(self._distance)
+
+    @classmethod
+    def for_file(cls, path: str, n_landmarks: int = 8, cache_size: int = 4096, **read_kwargs) -> 'DistanceOracle':
+        """Load a graph file and its landmark index, building and saving the index if missing or stale."""
+        graph = read_data_csr(path, **read_kwargs)
+        index_path = LandmarkIndex.default_path(path)
+        try:
+            index = LandmarkIndex.load(graph, index_path)
+        except (OSError, ValueError, KeyError):
+            index = LandmarkIndex.build(graph, n_landmarks)
+            index.save(index_path)
+        return cls(graph, index, cache_size)
+
+    def _distance(self, start: str, end: str) -> float:
+        source, target = self.graph.index[start], self.graph.index[end]
+        if self.index is not None:
+            return self.index.query(source, target)
+        return dijkstra(self.graph, source, target)
+
+
+if __name__ == "__main__":
+    import time
+
+    filepath = Path(__file__).parent / 'q8-data.txt'
+    oracle = DistanceOracle.for_file(str(filepath))
+    plain = DistanceOracle(oracle.graph)
+
+    print()
+    print('Road distances (ALT / Dijkstra):')
+    names = oracle.graph.names
+    for start, end in [(names[0], names[-1]), ('Prince Rupert', 'Lethbridge'), ('Vancouver', 'Edmonton')]:
+        print(f'\t{start} -> {end}: {oracle.distance(start, end)} / {plain.distance(start, end)} mi')
+
+    for label in ('uncached', 'cached'):
+        start = time.perf_counter()
+        for a in names:
+            for b in names:
+                oracle.distance(a, b)
+        elapsed = time.perf_counter() - start
+        print(f'\t{len(names) ** 2} {label} queries: {1e6 * elapsed / len(names) ** 2:.1f} us/query')
+    print()
@@ -0,0 +1,147 @@
+"""
+    External-memory Kruskal for edge files too large to hold in RAM.
+
+    The graph file (same 'start, end, NNNmi' format as hw3_q8.read_data) is read once in
+    chunks of edges. Each chunk is sorted by distance and spilled to a temporary file as
+    a binary run; the runs are then k-way merged in distance order and fed to a
+    union-find. At most fan_in runs are merged at once; when there are more, groups of
+    fan_in runs are first merged into longer runs on disk. Only the vertex table, the
+    union-find and fan_in read buffers are kept in memory (and fan_in files open), so
+    memory grows with the vertex count rather than the edge count.
+"""
+
+import heapq
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from hw3_q8 import UnionFind, _parse_graph_file
+
+
+EDGE_DTYPE = np.dtype([('dist', np.float64), ('start', np.int64), ('end', np.int64)])
+
+
+def _spill_run(run_dir: Path, run_index: int, edges: np.ndarray) -> Path:
+    run_path = run_dir / f'run-{run_index:05d}.bin'
+    np.sort(edges, order='dist', kind='stable').tofile(run_path)
+    return run_path
+
+
+def _read_run(run_path: Path, block_edges: int) -> Iterator[Tuple[float, int, int]]:
+    # The file is closed as soon as the run is used up
+    with open(run_path, 'rb') as f:
+        while True:
+            block = np.fromfile(f, dtype=EDGE_DTYPE, count=block_edges)
+            if len(block) == 0:
+                break
+            yield from block.tolist()
+
+
+def _merge_runs(run_dir: Path, run_index: int, run_paths: List[Path], block_edges: int) -> Path:
+    """Merge sorted runs into one new run, deleting the inputs."""
+    merged_path = run_dir / f'run-{run_index:05d}.bin'
+    runs = [_read_run(run_path, block_edges) for run_path in run_paths]
+    buffer = []
+    try:
+        with open(merged_path, 'wb') as f:
+            for edge in heapq.merge(*runs):
+                buffer.append(edge)
+                if len(buffer) == block_edges:
+                    np.array(buffer, dtype=EDGE_DTYPE).tofile(f)
+                    buffer.clear()
+            if buffer:
+                np.array(buffer, dtype=EDGE_DTYPE).tofile(f)
+    finally:
+        for run in runs:
+            run.close()
+    for run_path in run_paths:
+        run_path.unlink()
+    return merged_path
+
+
+def streaming_kruskal(
+    path: str = 'hw3/q8-data.txt',
+    chunk_edges: int = 1_000_000,
+    block_edges: int = 65_536,
+    tmp_dir: str = None,
+    fan_in: int = 64,
+):
+    """Yield the (from, to, dist) edges of a minimum spanning forest of a graph file.
+
+    Args:
+        path (str, optional): Path of the graph file. Defaults to 'hw3/q8-data.txt'.
+        chunk_edges (int, optional): Edges sorted in memory per spilled run. Defaults to 1,000,000.
+        block_edges (int, optional): Edges buffered per run while merging. Defaults to 65,536.
+        tmp_dir (str, optional): Where to create the run files. Defaults to the system temp dir.
+        fan_in (int, optional): Most runs merged (and files open) at once. Defaults to 64.
+
+    Edges are yielded in increasing distance order.
+    """
+    names: List[str] = []
+    index = {}
+
+    with tempfile.TemporaryDirectory(prefix='kruskal-runs-', dir=tmp_dir) as run_dir:
+        run_dir = Path(run_dir)
+        run_paths = []
+        chunk = np.empty(chunk_edges, dtype=EDGE_DTYPE)
+        filled = 0
+
+        for record in _parse_graph_file(path):
+            if len(record) == 1:
+                if record[0] not in index:
+                    index[record[0]] = len(names)
+                    names.append(record[0])
+                continue
+
+            start, end, dist = record
+            chunk[filled] = (dist, index[start], index[end])
+            filled += 1
+            if filled == chunk_edges:
+                run_paths.append(_spill_run(run_dir, len(run_paths), chunk))
+                filled = 0
+
+        if filled:
+            run_paths.append(_spill_run(run_dir, len(run_paths), chunk[:filled]))
+        del chunk
+
+        # Merge passes until a single fan_in-way merge is left
+        run_count = len(run_paths)
+        while len(run_paths) > fan_in:
+            merged = []
+            for lo in range(0, len(run_paths), fan_in):
+                merged.append(_merge_runs(run_dir, run_count, run_paths[lo:lo + fan_in], block_edges))
+                run_count += 1
+            run_paths = merged
+
+        components = UnionFind(len(names))
+        remaining = len(names) - 1
+        runs = [_read_run(run_path, block_edges) for run_path in run_paths]
+        try:
+            for dist, a, b in heapq.merge(*runs):
+                if remaining <= 0:
+                    break
+                if components.union(a, b):
+                    remaining -= 1
+                    yield names[a], names[b], dist
+        finally:
+            for run in runs:
+                run.close()
+
+
+if __name__ == "__main__":
+    from hw3_q8 import prims_find_mst, read_data
+
+    filepath = Path(__file__).parent / 'q8-data.txt'
+
+    print()
+    print('Computing MST with external-memory Kruskal (4-edge runs)...')
+    streamed = list(streaming_kruskal(str(filepath), chunk_edges=4))
+    for start_v, end_v, dist in streamed:
+        print(f'\t{start_v} <-> {end_v} : {dist} mi')
+
+    vertices, adjacency_lists, _ = read_data(str(filepath))
+    expected = sum(dist for _, _, dist in prims_find_mst(vertices, adjacency_lists))
+    print(f'\tTotal {sum(dist for _, _, dist in streamed)} mi (Prim: {expected} mi)')
+    print()
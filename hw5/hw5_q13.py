@@ -11,12 +11,140 @@
     to minimize the expected cost of backlog and storage.
 """
 
+import os
+import sys
+import time
 import numpy as np
 import math
 import numpy.random as npr
+from collections import namedtuple
+from statistics import NormalDist
+from scipy.special import ndtr, ndtri
+
+# sim_cache.py is shared with hw6 and lives in the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from sim_cache import ResultCache, mser_warmup
 
 rng = npr.default_rng()
 
+class RunningStats:
+    """Welford running mean/variance, plus min and max, in O(1) memory."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other: 'RunningStats'):
+        """Combine with statistics of another sample (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile with the P² algorithm (Jain & Chlamtac, 1985).
+
+    Keeps five markers instead of the sample, so memory and per-observation work are O(1).
+    """
+
+    def __init__(self, q: float):
+        self.q = q
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x: float):
+        self.count += 1
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        positions, desired = self.positions, self.desired
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                # Piecewise-parabolic prediction, falling back to linear if it breaks monotonicity
+                candidate = heights[i] + d / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + d) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - d) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+                )
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = candidate
+                positions[i] += d
+
+    @property
+    def value(self) -> float:
+        if not self.heights:
+            return math.nan
+        if self.count <= 5:
+            # The markers are only the sorted sample until a sixth observation moves them
+            return float(np.quantile(self.heights, self.q))
+        return self.heights[2]
+
+
+InventorySimResult = namedtuple(
+    'InventorySimResult',
+    ['mean_cost', 'cost_stats', 'cost_quantiles', 'negative_orders', 'trace'],
+)
+InventorySimResult.__doc__ = """Statistics of one run_inventory_management_sim trial (collect_stats=True).
+
+    mean_cost: Mean weekly cost after warmup (what the function returns by default).
+    cost_stats: RunningStats of the post-warmup weekly cost.
+    cost_quantiles: {q: streaming P² estimate} of the post-warmup weekly cost.
+    negative_orders: Number of weeks (warmup included) with a negative order.
+    trace: Sampled (week, demand, order, storage, backlog, cost) tuples, every trace_every weeks.
+"""
+
+
 def run_inventory_management_sim(
     weeks: int = 1000,
     p_base_order: float = 100,
@@ -28,10 +156,33 @@ def run_inventory_management_sim(
     demand_stddev: float = 10,
     trial_number: int = 1,
     warmup_weeks: int = 100,
+    collect_stats: bool = False,
+    quantiles = (0.5, 0.9, 0.99),
+    trace_every: int = 0,
 ):
+    """Simulate one trial of the base-order policy.
+
+    Negative orders are counted and reported once at the end of the trial rather than
+    printed from inside the week loop.
+
+    Args:
+        collect_stats (bool, optional): Return an InventorySimResult with running 
+            statistics instead of only the mean weekly cost. Defaults to False.
+        quantiles (optional): Cost quantiles to track when collect_stats is set.
+            Defaults to (0.5, 0.9, 0.99).
+        trace_every (int, optional): When collect_stats is set, keep every n-th week's 
+            state in the trace (0 keeps none). Defaults to 0.
+        Other arguments: Simulation parameters; costs are averaged over weeks after warmup_weeks.
+    """
     total_cost = 0
     s_i = starting_storage
     b_i = starting_backlog
+    negative_orders = 0
+
+    if collect_stats:
+        cost_stats = RunningStats()
+        cost_quantiles = [P2Quantile(q) for q in quantiles]
+        trace = []
     
     for i in range(weeks):
         demand: float = rng.normal(demand_mean, demand_stddev)
@@ -40,15 +191,427 @@ def run_inventory_management_sim(
         s_i = max(0, demand - p_base_order)
         b_i = -min(0, demand - p_base_order)
         if order < 0:
-            print(f"Trial {trial_number} Iteration {i+1} - Warning: order is negative {order}")
+            negative_orders += 1
 
         if i >= warmup_weeks:
-            total_cost += s_i * cost_per_unit_storage + b_i * cost_per_unit_backlog
+            cost = s_i * cost_per_unit_storage + b_i * cost_per_unit_backlog
+            total_cost += cost
+            if collect_stats:
+                cost_stats.add(cost)
+                for estimator in cost_quantiles:
+                    estimator.add(cost)
+
+        if collect_stats and trace_every and i % trace_every == 0:
+            trace.append((i, demand, order, s_i, b_i, s_i * cost_per_unit_storage + b_i * cost_per_unit_backlog))
+
+    if negative_orders > 0:
+        print(f"Trial {trial_number} - Warning: order was negative in {negative_orders} of {weeks} weeks")
     
     weeks_to_count = weeks - warmup_weeks
+    if collect_stats:
+        return InventorySimResult(
+            mean_cost=total_cost / weeks_to_count,
+            cost_stats=cost_stats,
+            cost_quantiles={estimator.q: estimator.value for estimator in cost_quantiles},
+            negative_orders=negative_orders,
+            trace=trace,
+        )
     return total_cost / weeks_to_count
 
 
+def _simulate_demand(
+    demand: np.ndarray,
+    p_base_order: float,
+    starting_storage: float,
+    starting_backlog: float,
+    cost_per_unit_storage: float,
+    cost_per_unit_backlog: float,
+    warmup_weeks: int,
+):
+    """Apply the base-order policy to a (trials, weeks) demand matrix.
+    
+    Returns (mean weekly cost after warmup per trial, number of negative orders).
+    """
+    trials = demand.shape[0]
+
+    # Storage and backlog at the end of each week depend only on that week's demand
+    shortfall = demand - p_base_order
+    s = np.maximum(0, shortfall)
+    b = np.maximum(0, -shortfall)
+
+    # The order placed in week i uses the storage/backlog left by week i-1
+    prev_s = np.concatenate([np.full((trials, 1), starting_storage), s[:, :-1]], axis=1)
+    prev_b = np.concatenate([np.full((trials, 1), starting_backlog), b[:, :-1]], axis=1)
+    negative_orders = np.count_nonzero(p_base_order - prev_s + prev_b < 0)
+
+    cost = s[:, warmup_weeks:] * cost_per_unit_storage + b[:, warmup_weeks:] * cost_per_unit_backlog
+    return cost.mean(axis=1), negative_orders
+
+
+def run_inventory_management_sim_batch(
+    trials: int = 1000,
+    weeks: int = 1000,
+    p_base_order: float = 100,
+    starting_storage: float = 0,
+    starting_backlog: float = 0,
+    cost_per_unit_storage: float = 2,
+    cost_per_unit_backlog: float = 3,
+    demand_mean: float = 100,
+    demand_stddev: float = 10,
+    warmup_weeks: int = 100,
+    max_block_size: int = 1 << 22,
+    control_variate: bool = False,
+) -> np.ndarray:
+    """Vectorized equivalent of calling run_inventory_management_sim once per trial.
+
+    Draws the demand of a block of trials as one (trials, weeks) matrix and computes
+    storage, backlog and cost with array operations instead of a Python loop per week.
+
+    Args:
+        trials (int, optional): Number of independent trials. Defaults to 1000.
+        max_block_size (int, optional): Upper bound on trials * weeks drawn at once, 
+            to cap memory use. Defaults to 4M values (32 MB).
+        control_variate (bool, optional): Use each trial's mean storage, whose expectation
+            is known in closed form (see expected_weekly_cost), as a control variate with the
+            regression-optimal coefficient. Keeps the expectation and lowers the variance. 
+            Defaults to False.
+        Other arguments: As in run_inventory_management_sim.
+
+    Returns:
+        np.ndarray: Mean weekly cost (after warmup) of each trial, shape (trials,).
+    """
+    block_trials = max(1, max_block_size // weeks)
+    mean_costs = np.empty(trials)
+    mean_storage = np.empty(trials)
+    negative_orders = 0
+
+    for lo in range(0, trials, block_trials):
+        hi = min(trials, lo + block_trials)
+        demand = rng.normal(demand_mean, demand_stddev, size=(hi - lo, weeks))
+        mean_costs[lo:hi], block_negative_orders = _simulate_demand(
+            demand, p_base_order, starting_storage, starting_backlog,
+            cost_per_unit_storage, cost_per_unit_backlog, warmup_weeks,
+        )
+        mean_storage[lo:hi] = np.maximum(0, demand[:, warmup_weeks:] - p_base_order).mean(axis=1)
+        negative_orders += block_negative_orders
+
+    if negative_orders > 0:
+        print(f"Warning: order was negative in {negative_orders} of {trials * weeks} simulated weeks")
+
+    if control_variate and trials > 1:
+        covariance = np.cov(mean_costs, mean_storage)
+        beta = covariance[0, 1] / covariance[1, 1]
+        expected_storage = _expected_storage(p_base_order, demand_mean, demand_stddev)
+        mean_costs = mean_costs - beta * (mean_storage - expected_storage)
+
+    return mean_costs
+
+
+def _expected_storage(p_base_order, demand_mean, demand_stddev):
+    """E[max(0, D - P)] for D ~ Normal(demand_mean, demand_stddev): stddev * L(z)."""
+    z = (p_base_order - demand_mean) / demand_stddev
+    loss = np.exp(-z * z / 2) / math.sqrt(2 * math.pi) - z * ndtr(-z)
+    return demand_stddev * loss
+
+
+def expected_weekly_cost(
+    p_base_order=100,
+    demand_mean=100,
+    demand_stddev=10,
+    cost_per_unit_storage=2,
+    cost_per_unit_backlog=3,
+):
+    """Closed-form expected weekly cost of the base-order policy under normal demand.
+
+    Each week's storage is max(0, D - P) and backlog is max(0, P - D) = (P - D) + storage,
+    so with z = (P - mean) / stddev and the standard normal loss function 
+    L(z) = phi(z) - z (1 - Phi(z)):
+
+        E[cost] = c_storage * stddev * L(z) + c_backlog * stddev * (z + L(z))
+
+    Weeks are independent, so this is also the expected post-warmup mean cost of a
+    simulation run. Arguments broadcast, so whole parameter grids are evaluated at once.
+    """
+    p_base_order, demand_mean, demand_stddev = np.broadcast_arrays(
+        np.asarray(p_base_order, dtype=np.float64), demand_mean, demand_stddev)
+    storage = _expected_storage(p_base_order, demand_mean, demand_stddev)
+    backlog = p_base_order - demand_mean + storage
+    return cost_per_unit_storage * storage + cost_per_unit_backlog * backlog
+
+
+def optimal_p_base_order(
+    demand_mean=100,
+    demand_stddev=10,
+    cost_per_unit_storage=2,
+    cost_per_unit_backlog=3,
+):
+    """Continuous P minimizing expected_weekly_cost: Phi(z*) = c_storage / (c_storage + c_backlog)."""
+    critical_ratio = np.asarray(cost_per_unit_storage) / (np.asarray(cost_per_unit_storage) + cost_per_unit_backlog)
+    return demand_mean + demand_stddev * ndtri(critical_ratio)
+
+
+def validate_inventory_sim(
+    mean_costs: np.ndarray,
+    p_base_order: float = 100,
+    demand_mean: float = 100,
+    demand_stddev: float = 10,
+    cost_per_unit_storage: float = 2,
+    cost_per_unit_backlog: float = 3,
+    confidence: float = 0.999,
+):
+    """Check per-trial simulated mean costs against expected_weekly_cost.
+
+    Prints a warning when the analytical value falls outside the confidence interval
+    of the Monte Carlo estimate, which points at a drifting or broken simulator.
+
+    Returns:
+        (analytical cost, simulated mean, confidence interval half-width, passed)
+    """
+    expected = float(expected_weekly_cost(
+        p_base_order, demand_mean, demand_stddev, cost_per_unit_storage, cost_per_unit_backlog))
+    estimate = float(np.mean(mean_costs))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * np.std(mean_costs, ddof=1) / math.sqrt(len(mean_costs))
+
+    passed = abs(estimate - expected) <= half_width
+    if not passed:
+        print(f"Warning: simulated mean cost {estimate:.4f} ± {half_width:.4f} does not match analytical cost {expected:.4f} (p={p_base_order})")
+    return expected, estimate, half_width, passed
+
+
+def detect_warmup_weeks(
+    trials: int = 100,
+    weeks: int = 1000,
+    p_base_order: float = 100,
+    cost_per_unit_storage: float = 2,
+    cost_per_unit_backlog: float = 3,
+    demand_mean: float = 100,
+    demand_stddev: float = 10,
+    batch_size: int = 5,
+) -> int:
+    """Pick warmup_weeks for a parameter set with MSER-5 on a pilot run.
+
+    Simulates pilot trials, averages their weekly cost across trials and applies 
+    mser_warmup to that series. The starting storage and backlog only enter the first
+    week's order, not any week's cost, so they are not parameters here.
+    """
+    demand = rng.normal(demand_mean, demand_stddev, size=(trials, weeks))
+    s = np.maximum(0, demand - p_base_order)
+    b = np.maximum(0, p_base_order - demand)
+    weekly_cost = s * cost_per_unit_storage + b * cost_per_unit_backlog
+    return mser_warmup(weekly_cost.mean(axis=0), batch_size)
+
+
+# Bump whenever a change to the model or its random draws would alter cached outputs
+RESULT_CACHE_VERSION = 1
+
+
+def run_inventory_p_sweep(
+    p_values,
+    trials: int = 1000,
+    weeks: int = 1000,
+    starting_storage: float = 0,
+    starting_backlog: float = 0,
+    cost_per_unit_storage: float = 2,
+    cost_per_unit_backlog: float = 3,
+    demand_mean: float = 100,
+    demand_stddev: float = 10,
+    warmup_weeks: int = 100,
+    max_block_size: int = 1 << 22,
+    seed = None,
+    cache: ResultCache = None,
+    first_trial: int = 0,
+) -> np.ndarray:
+    """Evaluate every candidate P on the same demand streams (common random numbers).
+
+    Each trial draws one demand stream, and every P in p_values is simulated against
+    it. Differences between P values then reflect the policy rather than sampling
+    noise, so close candidates can be ranked with far fewer trials.
+
+    Args:
+        p_values: Candidate base-order levels.
+        seed (optional): Root seed; trial j then draws its demand from the j-th child of
+            SeedSequence(seed), so its costs do not depend on the number of trials. 
+            Defaults to the module generator.
+        cache (ResultCache, optional): With a seed, return stored costs for a repeated sweep
+            and only simulate the trials missing from the cache when more are asked for.
+        first_trial (int, optional): Index of the first trial, so that with a seed a sweep can
+            be continued by simulating trials first_trial..first_trial + trials - 1. Defaults to 0.
+        Other arguments: As in run_inventory_management_sim_batch.
+
+    Returns:
+        np.ndarray: Mean weekly cost of each (trial, P) pair, shape (trials, len(p_values)).
+    """
+    total = first_trial + trials
+    use_cache = cache is not None and seed is not None
+    cached = None
+    if use_cache:
+        key = cache.key(
+            p_values=p_values, weeks=weeks, starting_storage=starting_storage, starting_backlog=starting_backlog,
+            cost_per_unit_storage=cost_per_unit_storage, cost_per_unit_backlog=cost_per_unit_backlog,
+            demand_mean=demand_mean, demand_stddev=demand_stddev, warmup_weeks=warmup_weeks, seed=seed,
+            version=RESULT_CACHE_VERSION,
+        )
+        cached = cache.get(key)
+        if cached is not None and len(cached) >= total:
+            return cached[first_trial:total]
+        if cached is None and first_trial == 0:
+            cached = np.empty((0, len(p_values)))
+        elif cached is not None and len(cached) < first_trial:
+            # The stored trials stop short of first_trial, so simulate only the requested ones
+            # and leave the entry as it is
+            cached = None
+
+    # Rows hold trials offset..total - 1: the whole range from 0 when extending a cache entry
+    offset = first_trial if cached is None else 0
+    if seed is not None:
+        seed_sequences = npr.SeedSequence(seed).spawn(total)
+
+    block_trials = max(1, max_block_size // weeks)
+    mean_costs = np.empty((total - offset, len(p_values)))
+    if cached is not None:
+        mean_costs[:len(cached)] = cached
+
+    for lo in range(offset if cached is None else len(cached), total, block_trials):
+        hi = min(total, lo + block_trials)
+        if seed is None:
+            demand = rng.normal(demand_mean, demand_stddev, size=(hi - lo, weeks))
+        else:
+            demand = np.stack([
+                npr.default_rng(seed_sequences[j]).normal(demand_mean, demand_stddev, size=weeks)
+                for j in range(lo, hi)
+            ])
+        for j, p in enumerate(p_values):
+            mean_costs[lo - offset:hi - offset, j], _ = _simulate_demand(
+                demand, p, starting_storage, starting_backlog,
+                cost_per_unit_storage, cost_per_unit_backlog, warmup_weeks,
+            )
+
+    if use_cache and cached is not None:
+        cache.put(key, mean_costs)
+    return mean_costs[first_trial - offset:]
+
+
+def compare_p_values(p_values, costs: np.ndarray, confidence: float = 0.95):
+    """Paired comparison of each P against the best (lowest mean cost) candidate.
+
+    Args:
+        p_values: Candidate base-order levels, matching the columns of costs.
+        costs (np.ndarray): Output of run_inventory_p_sweep, shape (trials, len(p_values)).
+        confidence (float, optional): Confidence level of the intervals. Defaults to 0.95.
+
+    Returns:
+        List of (p, mean cost, mean cost - best mean cost, confidence interval half-width
+        of that difference), in the order of p_values.
+    """
+    trials = costs.shape[0]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    means = costs.mean(axis=0)
+    best = int(np.argmin(means))
+
+    differences = costs - costs[:, [best]]
+    half_widths = z * differences.std(axis=0, ddof=1) / math.sqrt(trials)
+    return [
+        (p, means[j], means[j] - means[best], half_widths[j])
+        for j, p in enumerate(p_values)
+    ]
+
+
+POptimizationResult = namedtuple(
+    'POptimizationResult',
+    ['best_p', 'remaining_p', 'mean_costs', 'trials', 'simulated_weeks', 'brute_force_weeks'],
+)
+
+
+def optimize_p_base_order(
+    p_min: int = 80,
+    p_max: int = 110,
+    confidence: float = 0.95,
+    indifference: float = 0.01,
+    initial_trials: int = 20,
+    batch_trials: int = 20,
+    max_trials: int = 2000,
+    brute_force_trials: int = 1000,
+    weeks: int = 1000,
+    warmup_weeks: int = 100,
+    **sim_kwargs,
+) -> POptimizationResult:
+    """Find the best integer P with the KN fully sequential procedure (Kim & Nelson, 2001).
+
+    Every integer P in [p_min, p_max] starts as a candidate. The variances of the paired
+    cost differences over the first initial_trials common-random-number trials fix, for
+    each pair of candidates, a continuation region that narrows as trials are added.
+    Rounds of batch_trials trials are run for the surviving candidates only, and a 
+    candidate is eliminated once its mean cost exceeds another survivor's by more than
+    that pair's region allows. Checking only every batch_trials trials is conservative.
+    With probability at least `confidence` the last survivor is within `indifference`
+    of the best P. If max_trials runs out first, the survivor with the lowest mean is
+    returned without that guarantee.
+
+    Args:
+        p_min (int, optional): Smallest candidate P. Defaults to 80.
+        p_max (int, optional): Largest candidate P. Defaults to 110.
+        confidence (float, optional): Probability of a correct selection. Defaults to 0.95.
+        indifference (float, optional): Cost difference below which candidates count as
+            equally good. Defaults to 0.01.
+        initial_trials (int, optional): First-stage trials, at least 2. Defaults to 20.
+        batch_trials (int, optional): Trials added per round. Defaults to 20.
+        max_trials (int, optional): Trial budget per candidate. Defaults to 2000.
+        brute_force_trials (int, optional): Trials per P of the brute-force sweep used in the 
+            simulated-weeks comparison. Defaults to 1000.
+        Other arguments: As in run_inventory_p_sweep. With a seed, every round continues 
+            the seeded trial sequence where the previous one stopped.
+    """
+    if initial_trials < 2:
+        raise ValueError(f"initial_trials must be at least 2 to estimate variances, got {initial_trials}")
+
+    survivors = list(range(p_min, p_max + 1))
+    candidates = len(survivors)
+    costs = run_inventory_p_sweep(
+        survivors, trials=initial_trials, weeks=weeks, warmup_weeks=warmup_weeks, **sim_kwargs)
+    simulated_weeks = initial_trials * weeks * candidates
+
+    # First-stage variance of every pairwise difference, and the KN region constant h^2
+    variances = np.var(costs[:, :, None] - costs[:, None, :], axis=0, ddof=1)
+    eta = 0.5 * ((2 * (1 - confidence) / max(1, candidates - 1)) ** (-2 / (initial_trials - 1)) - 1)
+    h_squared = 2 * eta * (initial_trials - 1)
+    alive = np.arange(candidates)
+
+    while True:
+        trials = costs.shape[0]
+        means = costs.mean(axis=0)
+
+        # Half-width of the continuation region of each pair after this many trials
+        region = np.maximum(
+            0, indifference / (2 * trials) * (h_squared * variances[np.ix_(alive, alive)] / indifference ** 2 - trials))
+        # The lowest mean is never more than a region above another, so one always survives
+        keep = ~np.any(means[:, None] - means[None, :] > region, axis=1)
+        alive = alive[keep]
+        survivors = [p for p, k in zip(survivors, keep) if k]
+        costs = costs[:, keep]
+
+        if len(survivors) == 1 or trials >= max_trials:
+            break
+
+        new_trials = min(batch_trials, max_trials - trials)
+        costs = np.concatenate([
+            costs,
+            run_inventory_p_sweep(
+                survivors, trials=new_trials, weeks=weeks, warmup_weeks=warmup_weeks,
+                first_trial=trials, **sim_kwargs),
+        ])
+        simulated_weeks += new_trials * weeks * len(survivors)
+
+    means = costs.mean(axis=0)
+    return POptimizationResult(
+        best_p=survivors[int(np.argmin(means))],
+        remaining_p=survivors,
+        mean_costs=means,
+        trials=costs.shape[0],
+        simulated_weeks=simulated_weeks,
+        brute_force_weeks=(p_max - p_min + 1) * brute_force_trials * weeks,
+    )
+
 
 costs = np.array([
     run_inventory_management_sim(
@@ -65,6 +628,21 @@ print(f"Mean weekly cost: {np.mean(costs)}")
 print(f"Std deviation: {np.std(costs)}")
 print()
 
+# Benchmark: scalar loop vs. vectorized engine for the part (b) workload
+start = time.perf_counter()
+for i in range(100):
+    run_inventory_management_sim(trial_number=i+1, warmup_weeks=100, weeks=1000)
+scalar_time = (time.perf_counter() - start) * 10
+
+start = time.perf_counter()
+costs = run_inventory_management_sim_batch(trials=1000, warmup_weeks=100, weeks=1000)
+batch_time = time.perf_counter() - start
+
+print("Benchmark - p=100, warmup=100, weeks=1000, iterations=1000")
+print(f"Vectorized mean weekly cost: {np.mean(costs)} (std deviation {np.std(costs)})")
+print(f"Scalar loop: {scalar_time:.2f}s (extrapolated from 100 trials), vectorized: {batch_time:.3f}s, speedup: {scalar_time / batch_time:.0f}x")
+print()
+
 
 for p in [
     80, 
@@ -81,17 +659,65 @@ for p in [
     105, 
     110, 
 ]:
-    costs = np.array([
-        run_inventory_management_sim(
-            trial_number=i+1,
-            warmup_weeks=100,
-            weeks=1000,
-            p_base_order=p,
-        )
-        for i in range(1000)
-    ])
+    costs = run_inventory_management_sim_batch(
+        trials=1000,
+        warmup_weeks=100,
+        weeks=1000,
+        p_base_order=p,
+    )
 
     print(f"Part (c) - p={p:3} - mean weekly cost={np.mean(costs)}")
     
     
     
+
+
+p_values = [93, 94, 95, 96, 97, 98, 99, 100, 101]
+costs = run_inventory_p_sweep(p_values, trials=200, warmup_weeks=100, weeks=1000, seed=103, cache=ResultCache())
+
+print()
+print("Part (c) - common random numbers, iterations=200, 95% CI of paired difference vs. best P")
+for p, mean_cost, difference, half_width in compare_p_values(p_values, costs):
+    print(f"Part (c) - p={p:3} - mean weekly cost={mean_cost:.4f} - vs. best={difference:+.4f} ± {half_width:.4f}")
+
+result = optimize_p_base_order(p_min=80, p_max=110, warmup_weeks=100, weeks=1000)
+
+print()
+print("Part (c) - KN ranking-and-selection over p=80..110, 95% probability of a P within 0.01 of the best")
+print(f"Best p={result.best_p} (still in contention: {result.remaining_p}, mean weekly costs {np.round(result.mean_costs, 4)})")
+print(f"Used {result.trials} trials and {result.simulated_weeks:,} simulated weeks vs. {result.brute_force_weeks:,} for a 1000-trial brute-force sweep")
+
+print()
+print("Analytical expected weekly cost (normal loss function)")
+for p in [80, 90, 95, 97, 98, 100, 105, 110]:
+    print(f"Analytical - p={p:3} - expected weekly cost={float(expected_weekly_cost(p)):.4f}")
+print(f"Analytical - optimal continuous p={float(optimal_p_base_order()):.3f}")
+
+plain = run_inventory_management_sim_batch(trials=200, p_base_order=97)
+controlled = run_inventory_management_sim_batch(trials=200, p_base_order=97, control_variate=True)
+print(f"Control variate (p=97, 200 trials): std deviation {np.std(plain):.4f} => {np.std(controlled):.4f}")
+expected, estimate, half_width, passed = validate_inventory_sim(controlled, p_base_order=97)
+print(f"Validation (p=97): analytical={expected:.4f}, simulated={estimate:.4f} ± {half_width:.4f}, {'OK' if passed else 'MISMATCH'}")
+
+grid_p, grid_stddev = np.meshgrid(np.arange(80, 121), np.linspace(1, 30, 1000))
+start = time.perf_counter()
+grid_costs = expected_weekly_cost(grid_p, demand_stddev=grid_stddev)
+print(f"Screened {grid_costs.size:,} (p, stddev) combinations in {1e3 * (time.perf_counter() - start):.2f} ms")
+
+result = run_inventory_management_sim(p_base_order=97, weeks=100_000, collect_stats=True, trace_every=20_000)
+
+print()
+print("Streaming statistics - p=97, warmup=100, weeks=100000")
+print(f"Weekly cost: mean={result.mean_cost:.4f}, std deviation={result.cost_stats.stddev:.4f}, max={result.cost_stats.max:.2f}")
+print("Weekly cost quantiles: " + ", ".join(f"q{q:g}={v:.2f}" for q, v in result.cost_quantiles.items()))
+print(f"Negative orders: {result.negative_orders}")
+for week, demand, order, storage, backlog, cost in result.trace:
+    print(f"\tWeek {week:6}: demand={demand:.1f}, order={order:.1f}, storage={storage:.1f}, backlog={backlog:.1f}, cost={cost:.2f}")
+
+warmup_weeks = detect_warmup_weeks(p_base_order=97)
+costs = run_inventory_management_sim_batch(trials=1000, p_base_order=97, warmup_weeks=warmup_weeks, weeks=warmup_weeks + 900)
+expected, estimate, half_width, passed = validate_inventory_sim(costs, p_base_order=97)
+
+print()
+print(f"MSER-5 warmup (p=97): {warmup_weeks} weeks instead of the fixed 100")
+print(f"{warmup_weeks + 900} weeks per trial: simulated={estimate:.4f} ± {half_width:.4f}, analytical={expected:.4f}, {'OK' if passed else 'MISMATCH'}")
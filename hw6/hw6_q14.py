@@ -12,14 +12,176 @@
 # %%
 # Part (b)
 
+import os
+import sys
+from collections import namedtuple
 from typing import Callable
 import numpy as np
 import math
+import time
 import numpy.random as npr
 
+# sim_cache.py is shared with hw5 and lives in the parent directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from sim_cache import ResultCache, mser_warmup
+
 rng = npr.default_rng()
 
 
+SCHEDULED_ARRIVAL_INDEX = 0
+ARRIVAL_TIME_INDEX = 1
+CONSENT_TIME_INDEX = 2
+PATIENT_PREPSTART_INDEX = 3
+PATIENT_PREPPED_INDEX = 4
+ROOM_PREPPED_INDEX = 5
+EXAM_STARTED_INDEX = 6
+EXAM_FINISHED_INDEX = 7
+
+
+def _summarize_patient_times(values: np.ndarray, w_warmup: int):
+    """Compute the five output statistics from the (8, n_patients) array of event times."""
+    stats_vals = values[:, w_warmup:]
+
+    avg_time = np.mean(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[ARRIVAL_TIME_INDEX])
+    avg_time_from_scheduled = np.mean(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[SCHEDULED_ARRIVAL_INDEX])
+
+    total_examinprogress_time = np.sum(
+        stats_vals[EXAM_FINISHED_INDEX] - stats_vals[EXAM_STARTED_INDEX]
+    )
+    total_examroomprep_time = np.sum(
+        stats_vals[ROOM_PREPPED_INDEX, 1:] - stats_vals[EXAM_FINISHED_INDEX, :-1]
+    )
+    total_patientprep_time = np.sum(
+        stats_vals[PATIENT_PREPPED_INDEX] - stats_vals[PATIENT_PREPSTART_INDEX]
+    )
+
+    total_time = stats_vals[EXAM_FINISHED_INDEX, -1] - stats_vals[CONSENT_TIME_INDEX, 0]
+    
+    examinprogress_percent = total_examinprogress_time / total_time
+    examroomprep_percent = total_examroomprep_time / total_time
+    patientprep_percent = total_patientprep_time / total_time
+
+    # # Sanity checks
+    # print("mean wait time waiting on exam room:", 
+    #     np.mean(np.maximum(0, 
+    #         stats_vals[EXAM_STARTED_INDEX] - stats_vals[PATIENT_PREPPED_INDEX]
+    #     ))
+    # )
+    # print("mean wait time on prev patient:", np.mean(stats_vals[PATIENT_PREPSTART_INDEX] - stats_vals[CONSENT_TIME_INDEX]))
+    # print("mean exam duration: ", np.mean(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[EXAM_STARTED_INDEX]))
+    # print("mean patient prep time: ", total_patientprep_time / (n_patients - w_warmup))
+    # print("mean time exam room vacant: ", 
+    #     np.mean(np.maximum(0,
+    #         stats_vals[CONSENT_TIME_INDEX, 1:] - stats_vals[EXAM_FINISHED_INDEX, :-1]
+    #     ))
+    # )
+    
+    return avg_time, avg_time_from_scheduled, examinprogress_percent, examroomprep_percent, patientprep_percent
+
+
+class _CountingGenerator:
+    """Stands in for a numpy Generator and counts the variates its methods return."""
+
+    def __init__(self, generator: npr.Generator, profiler: 'SimProfiler'):
+        self._generator = generator
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        method = getattr(self._generator, name)
+        if not callable(method):
+            return method
+        profiler = self._profiler
+
+        def counted(*args, **kwargs):
+            result = method(*args, **kwargs)
+            profiler.rng_draws += np.size(result)
+            return result
+        return counted
+
+
+class SimProfiler:
+    """Opt-in instrumentation for the radiology simulation engines and run_multiple_sim.
+
+    Pass one as profiler= to collect, across all the runs it sees: call counts and 
+    cumulative wall time of every stage function, kept per engine ('scalar.*' and 
+    'replications.*'), the number of variates drawn from the module generator rng, and
+    patients and replications simulated per second. Nothing is wrapped or timed when no
+    profiler is passed.
+
+    Stage callables that draw from their own generator are timed but their draws are
+    not counted.
+    """
+
+    def __init__(self):
+        # Stage name -> [calls, nanoseconds]
+        self.stages = {}
+        self.rng_draws = 0
+        self.runs = 0
+        self.patients = 0
+        self.replications = 0
+        self.seconds = 0.0
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """func, counting its calls and wall time under name."""
+        stats = self.stages.setdefault(name, [0, 0])
+        clock = time.perf_counter_ns
+
+        def timed(*args):
+            start = clock()
+            result = func(*args)
+            stats[1] += clock() - start
+            stats[0] += 1
+            return result
+        return timed
+
+    def record_run(self, patients: int, replications: int, seconds: float):
+        self.runs += 1
+        self.patients += patients
+        self.replications += replications
+        self.seconds += seconds
+
+    def report(self) -> dict:
+        """Collected measurements as a JSON-serializable dict."""
+        return {
+            'stages': {
+                name: {'calls': calls, 'seconds': ns / 1e9, 'mean_us': ns / 1e3 / calls if calls else 0.0}
+                for name, (calls, ns) in self.stages.items()
+            },
+            'rng_draws': int(self.rng_draws),
+            'runs': self.runs,
+            'patients': self.patients,
+            'replications': self.replications,
+            'seconds': self.seconds,
+            'patients_per_second': self.patients / self.seconds if self.seconds else 0.0,
+            'replications_per_second': self.replications / self.seconds if self.seconds else 0.0,
+        }
+
+    def save(self, path: str):
+        import json
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def _run_profiled(engine: Callable, engine_name: str, profiler: SimProfiler, replications: int, n_patients: int, **stage_funcs):
+    """Call engine with every stage function wrapped and the module rng counted.
+
+    Stages are recorded as '<engine_name>.<stage>' (e.g. 'replications.arrival_time'), so a
+    per-patient scalar call and a length-R vector call never share a counter.
+    """
+    global rng
+    generator = rng
+    # The default stage functions look up the module-level rng when called
+    rng = _CountingGenerator(generator, profiler)
+    start = time.perf_counter()
+    try:
+        return engine(**{
+            name: profiler.wrap(f"{engine_name}.{name[:-len('_func')]}", func) for name, func in stage_funcs.items()
+        })
+    finally:
+        rng = generator
+        profiler.record_run(n_patients * replications, replications, time.perf_counter() - start)
+
+
 def run_radiology_dept_sim(
     n_patients: int = 10000,
     w_warmup: int = 100,
@@ -49,6 +211,8 @@ def run_radiology_dept_sim(
                 (8 if rng.random() < (1/3.0) else 
                     (10 if rng.random() < 0.5 else 12)
                 ),
+    trace: np.ndarray = None,
+    profiler: SimProfiler = None,
 ):
     """Run a simulation of the radiology department
 
@@ -73,203 +237,1055 @@ def run_radiology_dept_sim(
         exam_finished_func (Callable[[float, float, float], optional): Function to calculate when a patient's exam is 
             finished. Takes (patient_prepped, room_prepped) as inputs. 
             Defaults to max(patient_prepped, room_prepped) + (8, 10, or 12 mins with equal probability).
+        trace (np.ndarray, optional): (8, n_patients) array to record every patient's event times in,
+            indexed by the *_INDEX constants, for debugging. Statistics are then computed from it.
+            By default only the previous patient's finish time and running totals are kept, so
+            memory does not grow with n_patients.
+        profiler (SimProfiler, optional): Record per-stage timings, RNG draws and throughput.
     """
+    if profiler is not None:
+        return _run_profiled(
+            lambda **stage_funcs: run_radiology_dept_sim(n_patients, w_warmup, trace=trace, **stage_funcs),
+            'scalar', profiler, 1, n_patients,
+            scheduled_arrival_func=scheduled_arrival_func,
+            arrival_time_func=arrival_time_func,
+            consent_finished_func=consent_finished_func,
+            patient_prepstart_func=patient_prepstart_func,
+            patient_prepped_func=patient_prepped_func,
+            room_prepped_func=room_prepped_func,
+            exam_started_func=exam_started_func,
+            exam_finished_func=exam_finished_func,
+        )
 
-    values = np.zeros((8, n_patients))
-
-    scheduled_arrival_index = 0
-    arrival_time_index = 1
-    consent_time_index = 2
-    patient_prepstart_index = 3
-    patient_prepped_index = 4
-    room_prepped_index = 5
-    exam_started_index = 6
-    exam_finished_index = 7
-    
     prev_patient_finish_time = 0
+    
+    total_time_in_system = 0.0
+    total_time_from_scheduled = 0.0
+    total_examinprogress_time = 0.0
+    total_examroomprep_time = 0.0
+    total_patientprep_time = 0.0
+    first_counted_consent_time = 0.0
+
     for i in range(n_patients):
         scheduled_arrival = scheduled_arrival_func(i)
-        values[scheduled_arrival_index][i] = scheduled_arrival
-        
         arrival_time = arrival_time_func(scheduled_arrival)
-        values[arrival_time_index ][i] = arrival_time
-
         consent_finished_time = consent_finished_func(arrival_time)
-        values[consent_time_index ][i] = consent_finished_time
-
         patient_prepstart_time = patient_prepstart_func(consent_finished_time, prev_patient_finish_time)
-        values[patient_prepstart_index][i] = patient_prepstart_time
-
         patient_prepped_time = patient_prepped_func(patient_prepstart_time)
-        values[patient_prepped_index][i] = patient_prepped_time
-
         room_prepped_time = room_prepped_func(prev_patient_finish_time)
-        values[room_prepped_index ][i] = room_prepped_time
-
         exam_started_time = exam_started_func(patient_prepped_time, room_prepped_time)
-        values[exam_started_index][i] = exam_started_time
-
         exam_finished_time = exam_finished_func(exam_started_time)
-        values[exam_finished_index][i] = exam_finished_time
+
+        if trace is not None:
+            trace[:, i] = (
+                scheduled_arrival, arrival_time, consent_finished_time, patient_prepstart_time,
+                patient_prepped_time, room_prepped_time, exam_started_time, exam_finished_time,
+            )
+
+        if i >= w_warmup:
+            total_time_in_system += exam_finished_time - arrival_time
+            total_time_from_scheduled += exam_finished_time - scheduled_arrival
+            total_examinprogress_time += exam_finished_time - exam_started_time
+            total_patientprep_time += patient_prepped_time - patient_prepstart_time
+            if i == w_warmup:
+                first_counted_consent_time = consent_finished_time
+            else:
+                total_examroomprep_time += room_prepped_time - prev_patient_finish_time
 
         prev_patient_finish_time = exam_finished_time
         
 
     # print("Finished")
-    stats_vals = values[:, w_warmup:]
+    if trace is not None:
+        return _summarize_patient_times(trace, w_warmup)
 
-    avg_time = np.mean(stats_vals[exam_finished_index] - stats_vals[arrival_time_index])
-    avg_time_from_scheduled = np.mean(stats_vals[exam_finished_index] - stats_vals[scheduled_arrival_index])
-
-    total_examinprogress_time = np.sum(
-        stats_vals[exam_finished_index] - stats_vals[exam_started_index]
-    )
-    total_examroomprep_time = np.sum(
-        stats_vals[room_prepped_index, 1:] - stats_vals[exam_finished_index, :-1]
-    )
-    total_patientprep_time = np.sum(
-        stats_vals[patient_prepped_index] - stats_vals[patient_prepstart_index]
+    patients_counted = n_patients - w_warmup
+    total_time = prev_patient_finish_time - first_counted_consent_time
+    return (
+        total_time_in_system / patients_counted,
+        total_time_from_scheduled / patients_counted,
+        total_examinprogress_time / total_time,
+        total_examroomprep_time / total_time,
+        total_patientprep_time / total_time,
     )
 
-    total_time = stats_vals[exam_finished_index, -1] - stats_vals[consent_time_index, 0]
-    
-    examinprogress_percent = total_examinprogress_time / total_time
-    examroomprep_percent = total_examroomprep_time / total_time
-    patientprep_percent = total_patientprep_time / total_time
 
-    # # Sanity checks
-    # print("mean wait time waiting on exam room:", 
-    #     np.mean(np.maximum(0, 
-    #         stats_vals[exam_started_index] - stats_vals[patient_prepped_index]
-    #     ))
-    # )
-    # print("mean wait time on prev patient:", np.mean(stats_vals[patient_prepstart_index] - stats_vals[consent_time_index]))
-    # print("mean exam duration: ", np.mean(stats_vals[exam_finished_index] - stats_vals[exam_started_index]))
-    # print("mean patient prep time: ", total_patientprep_time / (n_patients - w_warmup))
-    # print("mean time exam room vacant: ", 
-    #     np.mean(np.maximum(0,
-    #         stats_vals[consent_time_index, 1:] - stats_vals[exam_finished_index, :-1]
-    #     ))
-    # )
-    
-    return avg_time, avg_time_from_scheduled, examinprogress_percent, examroomprep_percent, patientprep_percent
+def run_radiology_dept_sim_batch(
+    n_patients: int = 10000,
+    w_warmup: int = 100,
+
+    scheduled_arrival_func: Callable[[np.ndarray], np.ndarray]
+        = lambda i: i * 30.0,
+    arrival_time_func: Callable[[np.ndarray], np.ndarray]
+        = lambda scheduled_arrival: scheduled_arrival + rng.uniform(-10, 10, size=len(scheduled_arrival)),
+    consent_finished_func: Callable[[np.ndarray], np.ndarray]
+        = lambda arrive_time:
+            arrive_time + np.where(rng.random(len(arrive_time)) < 0.8, 2, 10),
+    patient_prep_duration_func: Callable[[int], np.ndarray]
+        = lambda n: rng.exponential(15.0, size=n),
+    room_prep_duration_func: Callable[[int], np.ndarray]
+        = lambda n: np.full(n, 10.0),
+    exam_duration_func: Callable[[int], np.ndarray]
+        = lambda n: np.where(rng.random(n) < (1/3.0), 8, np.where(rng.random(n) < 0.5, 10, 12)),
+    separate_prep_room: bool = False,
+):
+    """Run a simulation of the radiology department with all random inputs drawn up front.
+
+    Same model as run_radiology_dept_sim, but every stochastic input is drawn for all 
+    patients at once as arrays and only the max-recurrence linking a patient to the 
+    previous exam is computed in a loop.
+
+    Args:
+        n_patients (int, optional): Number of patients to simulate. Defaults to 10000.
+        w_warmup (int, optional): Warmup period to skip for statistics calculation. 
+            Defaults to 100.
+        scheduled_arrival_func (Callable[[np.ndarray], np.ndarray], optional): Scheduled arrival 
+            times from patient indices. Defaults to i * 30 min.
+        arrival_time_func (Callable[[np.ndarray], np.ndarray], optional): Actual arrival times from 
+            scheduled arrival times. Defaults to scheduled_arrival + uniform(-10, 10).
+        consent_finished_func (Callable[[np.ndarray], np.ndarray], optional): Consent completion times
+            from arrival times. Defaults to arrive_time + 2 mins (80%) or 10 mins (20%).
+        patient_prep_duration_func (Callable[[int], np.ndarray], optional): n patient prep durations.
+            Defaults to exponential(mean=15.0).
+        room_prep_duration_func (Callable[[int], np.ndarray], optional): n exam room prep durations.
+            Defaults to 10 mins.
+        exam_duration_func (Callable[[int], np.ndarray], optional): n exam durations.
+            Defaults to 8, 10, or 12 mins with equal probability.
+        separate_prep_room (bool, optional): Patients start prep as soon as consent is done
+            instead of waiting for the previous exam to finish (part g). Defaults to False.
+    """
+    values = np.zeros((8, n_patients))
+
+    values[SCHEDULED_ARRIVAL_INDEX] = scheduled_arrival_func(np.arange(n_patients))
+    values[ARRIVAL_TIME_INDEX] = arrival_time_func(values[SCHEDULED_ARRIVAL_INDEX])
+    values[CONSENT_TIME_INDEX] = consent_finished_func(values[ARRIVAL_TIME_INDEX])
+    patient_prep_durations = patient_prep_duration_func(n_patients)
+    room_prep_durations = room_prep_duration_func(n_patients)
+    exam_durations = exam_duration_func(n_patients)
+
+    if separate_prep_room:
+        values[PATIENT_PREPSTART_INDEX] = values[CONSENT_TIME_INDEX]
+        values[PATIENT_PREPPED_INDEX] = values[CONSENT_TIME_INDEX] + patient_prep_durations
+
+    # Only these times depend on the previous patient's exam
+    prepstart_times = []
+    room_prepped_times = []
+    exam_started_times = []
+    exam_finished_times = []
+
+    prev_patient_finish_time = 0.0
+    if separate_prep_room:
+        for patient_prepped_time, room_prep, exam_duration in zip(
+            values[PATIENT_PREPPED_INDEX].tolist(), room_prep_durations.tolist(), exam_durations.tolist(),
+        ):
+            room_prepped_time = prev_patient_finish_time + room_prep
+            exam_started_time = patient_prepped_time if patient_prepped_time > room_prepped_time else room_prepped_time
+            prev_patient_finish_time = exam_started_time + exam_duration
+
+            room_prepped_times.append(room_prepped_time)
+            exam_started_times.append(exam_started_time)
+            exam_finished_times.append(prev_patient_finish_time)
+    else:
+        for consent_finished_time, patient_prep, room_prep, exam_duration in zip(
+            values[CONSENT_TIME_INDEX].tolist(), patient_prep_durations.tolist(), 
+            room_prep_durations.tolist(), exam_durations.tolist(),
+        ):
+            patient_prepstart_time = consent_finished_time if consent_finished_time > prev_patient_finish_time else prev_patient_finish_time
+            patient_prepped_time = patient_prepstart_time + patient_prep
+            room_prepped_time = prev_patient_finish_time + room_prep
+            exam_started_time = patient_prepped_time if patient_prepped_time > room_prepped_time else room_prepped_time
+            prev_patient_finish_time = exam_started_time + exam_duration
+
+            prepstart_times.append(patient_prepstart_time)
+            room_prepped_times.append(room_prepped_time)
+            exam_started_times.append(exam_started_time)
+            exam_finished_times.append(prev_patient_finish_time)
+
+        values[PATIENT_PREPSTART_INDEX] = prepstart_times
+        values[PATIENT_PREPPED_INDEX] = values[PATIENT_PREPSTART_INDEX] + patient_prep_durations
 
-run_radiology_dept_sim()
+    values[ROOM_PREPPED_INDEX] = room_prepped_times
+    values[EXAM_STARTED_INDEX] = exam_started_times
+    values[EXAM_FINISHED_INDEX] = exam_finished_times
+
+    return _summarize_patient_times(values, w_warmup)
+
+
+# A dozen live length-R float64 vectors at 2048 replications is ~200 KB, about an L2 cache
+REPLICATION_CHUNK_SIZE = 2048
+
+
+def run_radiology_dept_sim_replications(
+    replications: int,
+    n_patients: int = 10000,
+    w_warmup: int = 100,
+
+    scheduled_arrival_func: Callable[[np.ndarray], np.ndarray]
+        = lambda i: i * 30.0,
+    arrival_time_func: Callable[[np.ndarray], np.ndarray]
+        = lambda scheduled_arrival: scheduled_arrival + rng.uniform(-10, 10, size=len(scheduled_arrival)),
+    consent_finished_func: Callable[[np.ndarray], np.ndarray]
+        = lambda arrive_time:
+            arrive_time + np.where(rng.random(len(arrive_time)) < 0.8, 2, 10),
+    patient_prep_duration_func: Callable[[int], np.ndarray]
+        = lambda n: rng.exponential(15.0, size=n),
+    room_prep_duration_func: Callable[[int], np.ndarray]
+        = lambda n: np.full(n, 10.0),
+    exam_duration_func: Callable[[int], np.ndarray]
+        = lambda n: np.where(rng.random(n) < (1/3.0), 8, np.where(rng.random(n) < 0.5, 10, 12)),
+    separate_prep_room: bool = False,
+    mean_time_in_system: np.ndarray = None,
+    profiler: SimProfiler = None,
+) -> np.ndarray:
+    """Run independent replications of the radiology department simulation side by side.
+
+    The patient recurrence is sequential in the patient index but independent across
+    replications, so each patient step advances all replications at once as length-R
+    vectors. Statistics are accumulated as running sums, so memory is O(replications)
+    rather than O(replications * n_patients).
+
+    Args:
+        replications (int): Number of replications R to advance together.
+        mean_time_in_system (np.ndarray, optional): (n_patients,) array that receives each
+            patient's time in system averaged over the replications, warmup included.
+        profiler (SimProfiler, optional): Record per-stage timings, RNG draws and throughput.
+        Other arguments: As in run_radiology_dept_sim_batch. The stage functions are called 
+            once per patient with length-R arrays (and n=R).
+
+    Returns:
+        np.ndarray: Shape (replications, 5), the run_radiology_dept_sim outputs per replication.
+    """
+    if profiler is not None:
+        return _run_profiled(
+            lambda **stage_funcs: run_radiology_dept_sim_replications(
+                replications, n_patients, w_warmup, separate_prep_room=separate_prep_room,
+                mean_time_in_system=mean_time_in_system, **stage_funcs,
+            ),
+            'replications', profiler, replications, n_patients,
+            scheduled_arrival_func=scheduled_arrival_func,
+            arrival_time_func=arrival_time_func,
+            consent_finished_func=consent_finished_func,
+            patient_prep_duration_func=patient_prep_duration_func,
+            room_prep_duration_func=room_prep_duration_func,
+            exam_duration_func=exam_duration_func,
+        )
+
+    r = replications
+    patients_counted = n_patients - w_warmup
+
+    prev_patient_finish_time = np.zeros(r)
+    total_time_in_system = np.zeros(r)
+    total_time_from_scheduled = np.zeros(r)
+    total_examinprogress_time = np.zeros(r)
+    total_examroomprep_time = np.zeros(r)
+    total_patientprep_time = np.zeros(r)
+    first_counted_consent_time = np.zeros(r)
+
+    for i in range(n_patients):
+        scheduled_arrival = scheduled_arrival_func(np.full(r, i))
+        arrival_time = arrival_time_func(scheduled_arrival)
+        consent_finished_time = consent_finished_func(arrival_time)
+
+        if separate_prep_room:
+            patient_prepstart_time = consent_finished_time
+        else:
+            patient_prepstart_time = np.maximum(consent_finished_time, prev_patient_finish_time)
+        patient_prep = patient_prep_duration_func(r)
+        room_prep = room_prep_duration_func(r)
+        exam_duration = exam_duration_func(r)
+
+        room_prepped_time = prev_patient_finish_time + room_prep
+        exam_started_time = np.maximum(patient_prepstart_time + patient_prep, room_prepped_time)
+        exam_finished_time = exam_started_time + exam_duration
+
+        if mean_time_in_system is not None:
+            mean_time_in_system[i] = np.mean(exam_finished_time - arrival_time)
+        if i >= w_warmup:
+            total_time_in_system += exam_finished_time - arrival_time
+            total_time_from_scheduled += exam_finished_time - scheduled_arrival
+            total_examinprogress_time += exam_duration
+            total_patientprep_time += patient_prep
+            if i == w_warmup:
+                first_counted_consent_time = consent_finished_time
+            else:
+                total_examroomprep_time += room_prep
+
+        prev_patient_finish_time = exam_finished_time
+
+    total_time = prev_patient_finish_time - first_counted_consent_time
+    return np.stack([
+        total_time_in_system / patients_counted,
+        total_time_from_scheduled / patients_counted,
+        total_examinprogress_time / total_time,
+        total_examroomprep_time / total_time,
+        total_patientprep_time / total_time,
+    ], axis=1)
+
+
+if __name__ == "__main__":
+    run_radiology_dept_sim()
+
+# %%
+# Batch-drawn inputs vs. per-patient scalar draws
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    scalar_results = np.array([run_radiology_dept_sim() for _ in range(100)])
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = np.array([run_radiology_dept_sim_batch() for _ in range(100)])
+    batch_time = time.perf_counter() - start
+
+    print("Scalar draws: ", np.round(scalar_results.mean(axis=0), 4), f"{scalar_time:.2f}s / 100 replications")
+    print("Batch draws:  ", np.round(batch_results.mean(axis=0), 4), f"{batch_time:.2f}s / 100 replications")
+    print(f"Speedup: {scalar_time / batch_time:.1f}x")
 
 # %%
 # Part (c)
 
-def run_multiple_sim(iterations, sim_func=run_radiology_dept_sim, print_intermediate=False):
-    total_avg_time = 0 
-    total_avg_time_from_scheduled = 0 
-    total_examinprogress_percent = 0 
-    total_examroomprep_percent = 0
-    total_patientprep_percent = 0
-
-    def print_stats(n, indent_str=""):
-        avg_time = total_avg_time / n
-        avg_time_from_scheduled = total_avg_time_from_scheduled / n
-        examinprogress_percent = total_examinprogress_percent / n
-        examroomprep_percent = total_examroomprep_percent / n
-        patientprep_percent = total_patientprep_percent/ n
-
-        print(f"{indent_str}Avg time spent per patient", avg_time)
-        print(f"{indent_str}Avg time spent per patient (from scheduled arrival)", avg_time_from_scheduled)
-        print(f"{indent_str}Percentage of time spent conducting exams", examinprogress_percent)
-        print(f"{indent_str}Percentage of exam room time spent preparing the room:", examroomprep_percent)
-        print(f"{indent_str}Percentage of time spent preparing the patient:", patientprep_percent)
-
-    import time
+MultipleSimResult = namedtuple('MultipleSimResult', ['iterations', 'mean', 'half_width'])
+
+
+def run_multiple_sim(
+    iterations, 
+    sim_func=run_radiology_dept_sim, 
+    print_intermediate=False, 
+    replications_func=None,
+    chunk_size=REPLICATION_CHUNK_SIZE,
+    confidence=0.95,
+    rel_half_width=None,
+    min_iterations=100,
+    profiler=None,
+):
+    """Run the simulation repeatedly and print the mean and confidence interval of each output statistic.
+
+    Args:
+        iterations (int): Number of replications (the maximum when rel_half_width is given).
+        sim_func (Callable[[], tuple], optional): Runs one replication. Defaults to run_radiology_dept_sim.
+        print_intermediate (bool, optional): Print running means every few seconds. Defaults to False.
+        replications_func (Callable[[int], np.ndarray], optional): Runs R replications at once and 
+            returns their outputs as an (R, 5) array, e.g. run_radiology_dept_sim_replications.
+            Used instead of sim_func when given. The default sim_func is dispatched to 
+            run_radiology_dept_sim_replications automatically.
+        chunk_size (int, optional): Replications per replications_func call. 
+            Defaults to REPLICATION_CHUNK_SIZE.
+        confidence (float, optional): Confidence level of the intervals. Defaults to 0.95.
+        rel_half_width (float, optional): Stop as soon as every statistic's confidence interval
+            half-width is at most this fraction of its mean (checked after each sim_func call or
+            replications_func chunk, once min_iterations have run). Defaults to None (run all iterations).
+        min_iterations (int, optional): Replications to run before the stopping rule is checked,
+            so the variance estimate is trustworthy. Defaults to 100.
+        profiler (SimProfiler, optional): Time the simulation calls ('run_multiple_sim.simulate')
+            and the whole run ('run_multiple_sim'); the default engine also records its stages.
+
+    Returns:
+        MultipleSimResult: Replications run, and the mean and confidence interval half-width 
+            of the five output statistics.
+    """
+    from statistics import NormalDist
+
+    if iterations < 1:
+        raise ValueError(f"iterations must be at least 1, got {iterations}")
+
+    if replications_func is None and sim_func is run_radiology_dept_sim:
+        replications_func = run_radiology_dept_sim_replications
+        if profiler is not None:
+            replications_func = lambda r: run_radiology_dept_sim_replications(r, profiler=profiler)
+    if profiler is not None:
+        run_start = time.perf_counter_ns()
+        if replications_func is not None:
+            replications_func = profiler.wrap('run_multiple_sim.simulate', replications_func)
+        else:
+            sim_func = profiler.wrap('run_multiple_sim.simulate', sim_func)
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    # Running mean and sum of squared deviations per statistic (Welford, merged chunk by chunk)
+    means = np.zeros(5)
+    m2 = np.zeros(5)
+
     last_print = 0
 
-    for i in range(iterations):
-        vals = sim_func()
-        total_avg_time += vals[0]
-        total_avg_time_from_scheduled += vals[1]
-        total_examinprogress_percent += vals[2]
-        total_examroomprep_percent += vals[3]
-        total_patientprep_percent += vals[4]
-
-        if print_intermediate and time.time() - last_print > 3.0 and i > 0:
-            percent = round(i / iterations * 100)
-            print(f"{i}/{iterations} ({percent}%)")
+    i = 0
+    while i < iterations:
+        if replications_func is not None:
+            n = min(chunk_size, iterations - i)
+            outputs = np.asarray(replications_func(n))
+        else:
+            n = 1
+            outputs = np.asarray(sim_func())[np.newaxis]
+
+        chunk_means = outputs.mean(axis=0)
+        delta = chunk_means - means
+        means += delta * n / (i + n)
+        m2 += ((outputs - chunk_means) ** 2).sum(axis=0) + delta ** 2 * i * n / (i + n)
+        i += n
+
+        half_widths = z * np.sqrt(m2 / max(i - 1, 1) / i)
+        if rel_half_width is not None and i >= min_iterations and \
+                np.all(half_widths <= rel_half_width * np.abs(means)):
+            break
+
+        if print_intermediate and time.time() - last_print > 3.0 and i < iterations:
             last_print = time.time()
-            print_stats(i, f"    {i} ({percent}%): ")
+            _print_progress(means * i, i, iterations, half_widths)
 
         
+    print(f"FINAL ({i} replications)")
+    _print_stats(means * i, i, half_widths=half_widths)
+    if profiler is not None:
+        stats = profiler.stages.setdefault('run_multiple_sim', [0, 0])
+        stats[0] += 1
+        stats[1] += time.perf_counter_ns() - run_start
+    return MultipleSimResult(i, means, half_widths)
+
+
+def _print_stats(totals, n, indent_str="", half_widths=None):
+    labels = [
+        "Avg time spent per patient",
+        "Avg time spent per patient (from scheduled arrival)",
+        "Percentage of time spent conducting exams",
+        "Percentage of exam room time spent preparing the room:",
+        "Percentage of time spent preparing the patient:",
+    ]
+    means = np.asarray(totals) / n
+
+    for j, label in enumerate(labels):
+        if half_widths is None:
+            print(f"{indent_str}{label}", means[j])
+        else:
+            print(f"{indent_str}{label}", means[j], f"± {half_widths[j]:.3g}")
+
+
+def _print_progress(totals, i, iterations, half_widths=None):
+    percent = round(i / iterations * 100)
+    print(f"{i}/{iterations} ({percent}%)")
+    _print_stats(totals, i, f"    {i} ({percent}%): ", half_widths)
+
+
+RadiologyScenario = namedtuple(
+    'RadiologyScenario',
+    [
+        'n_patients', 'w_warmup', 'appointment_interval', 'arrival_jitter',
+        'consent_fast_probability', 'consent_fast', 'consent_slow',
+        'patient_prep_mean', 'room_prep', 'exam_durations', 'separate_prep_room',
+    ],
+    defaults=[10000, 100, 30.0, 10.0, 0.8, 2.0, 10.0, 15.0, 10.0, (8.0, 10.0, 12.0), False],
+)
+RadiologyScenario.__doc__ = """Picklable description of a radiology department scenario.
+
+    Defaults reproduce run_radiology_dept_sim: appointments every 30 mins, arrivals within
+    ±10 mins, consent taking 2 mins (80%) or 10 mins, exponential patient prep (mean 15),
+    10 mins room prep, and an exam of 8, 10 or 12 mins with equal probability. 
+    Variants are built with _replace, e.g. RadiologyScenario()._replace(room_prep=5.0).
+"""
+
+
+def run_scenario_replications(scenario: RadiologyScenario, replications: int, generator: npr.Generator, **kwargs) -> np.ndarray:
+    """run_radiology_dept_sim_replications for a scenario, drawing from the given generator."""
+    exam_durations = np.asarray(scenario.exam_durations, dtype=np.float64)
+    return run_radiology_dept_sim_replications(
+        replications,
+        n_patients=scenario.n_patients,
+        w_warmup=scenario.w_warmup,
+        scheduled_arrival_func=lambda i: i * scenario.appointment_interval,
+        arrival_time_func=lambda scheduled_arrival: 
+            scheduled_arrival + generator.uniform(-scenario.arrival_jitter, scenario.arrival_jitter, size=len(scheduled_arrival)),
+        consent_finished_func=lambda arrive_time:
+            arrive_time + np.where(
+                generator.random(len(arrive_time)) < scenario.consent_fast_probability, 
+                scenario.consent_fast, scenario.consent_slow,
+            ),
+        patient_prep_duration_func=lambda n: generator.exponential(scenario.patient_prep_mean, size=n),
+        room_prep_duration_func=lambda n: np.full(n, scenario.room_prep),
+        exam_duration_func=lambda n: exam_durations[generator.integers(len(exam_durations), size=n)],
+        separate_prep_room=scenario.separate_prep_room,
+        **kwargs,
+    )
+
+
+def _run_scenario_chunk(scenario: RadiologyScenario, seed_sequence: npr.SeedSequence, replications: int) -> np.ndarray:
+    # Reduce in the worker so only five sums travel back to the parent
+    return run_scenario_replications(scenario, replications, npr.default_rng(seed_sequence)).sum(axis=0)
+
+
+def run_multiple_sim_parallel(
+    iterations, 
+    scenario: RadiologyScenario = RadiologyScenario(), 
+    seed=None, 
+    workers=None, 
+    print_intermediate=False,
+    chunk_size=REPLICATION_CHUNK_SIZE,
+):
+    """Run replications of a scenario across a process pool and print the means.
+
+    The replications are cut into fixed chunks of chunk_size, and chunk k draws from the
+    k-th child of SeedSequence(seed).spawn. Partial sums are merged in chunk order, so
+    for a given seed the results are bit-identical whatever the number of workers.
+
+    Args:
+        iterations (int): Number of replications.
+        scenario (RadiologyScenario, optional): Scenario to simulate. Defaults to the baseline.
+        seed (optional): Root seed. Defaults to fresh OS entropy.
+        workers (int, optional): Worker processes. Defaults to os.cpu_count().
+        print_intermediate (bool, optional): Print running means every few seconds. Defaults to False.
+        chunk_size (int, optional): Replications per task. Defaults to REPLICATION_CHUNK_SIZE.
+
+    Returns:
+        np.ndarray: Mean of the five output statistics.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if iterations < 1:
+        raise ValueError(f"iterations must be at least 1, got {iterations}")
+
+    chunks = [min(chunk_size, iterations - lo) for lo in range(0, iterations, chunk_size)]
+    seed_sequences = npr.SeedSequence(seed).spawn(len(chunks))
+
+    totals = np.zeros(5)
+    last_print = 0
+    done = 0
+    # Spawned workers import this script to find _run_scenario_chunk, which is why every 
+    # driver cell runs only under `if __name__ == "__main__":`
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        partials = executor.map(_run_scenario_chunk, [scenario] * len(chunks), seed_sequences, chunks)
+        for n, partial in zip(chunks, partials):
+            totals += partial
+            done += n
+            if print_intermediate and time.time() - last_print > 3.0 and done < iterations:
+                last_print = time.time()
+                _print_progress(totals, done, iterations)
+
     print("FINAL")
-    print_stats(iterations)
+    _print_stats(totals, iterations)
+    return totals / iterations
+
+
+# Bump whenever a change to the model or its random draws would alter cached outputs
+RESULT_CACHE_VERSION = 1
+
+
+def run_scenario_seeded(
+    scenario: RadiologyScenario, 
+    replications: int, 
+    seed=None, 
+    chunk_size=REPLICATION_CHUNK_SIZE, 
+    cache: ResultCache = None,
+) -> np.ndarray:
+    """Per-replication outputs of a scenario, shape (replications, 5).
 
-run_multiple_sim(
-    iterations=100_000,
-    print_intermediate=True
+    Replications are simulated in full chunks of chunk_size, and chunk k draws from the 
+    k-th child of SeedSequence(seed), so replication j's outputs do not depend on how 
+    many replications are asked for. With a cache and an explicit seed, a repeated call
+    returns the stored outputs, and a call asking for more replications only simulates 
+    the chunks not yet cached.
+    """
+    use_cache = cache is not None and seed is not None
+    parts = []
+    if use_cache:
+        key = cache.key(scenario=scenario._asdict(), seed=seed, chunk_size=chunk_size, version=RESULT_CACHE_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            if len(cached) >= replications:
+                return cached[:replications]
+            parts.append(cached)
+
+    n_chunks = -(-replications // chunk_size)
+    seed_sequences = npr.SeedSequence(seed).spawn(n_chunks)
+    for k in range(sum(len(part) for part in parts) // chunk_size, n_chunks):
+        parts.append(run_scenario_replications(scenario, chunk_size, npr.default_rng(seed_sequences[k])))
+
+    outputs = np.concatenate(parts)
+    if use_cache:
+        cache.put(key, outputs)
+    return outputs[:replications]
+
+
+ScenarioComparison = namedtuple(
+    'ScenarioComparison', ['name', 'mean', 'delta', 'half_width', 'independent_half_width'],
 )
-# print("👆 part (c)")
+
+
+def compare_radiology_scenarios(
+    scenarios,
+    replications,
+    seed=None,
+    confidence=0.95,
+    chunk_size=REPLICATION_CHUNK_SIZE,
+    cache: ResultCache = None,
+):
+    """Compare scenarios to a baseline on common random numbers.
+
+    Every scenario replays replication j with the same generator state, and
+    run_scenario_replications draws the same variates in the same order whatever the
+    parameters (e.g. arrival_jitter=0 still consumes its uniform draws). The random 
+    inputs are therefore synchronized across scenarios, and the paired difference of 
+    replication j cancels most of the noise that independent runs would carry.
+
+    Args:
+        scenarios (dict): Scenario name -> RadiologyScenario. The first one is the baseline.
+        replications (int): Replications per scenario.
+        seed (optional): Root seed. Defaults to fresh OS entropy.
+        confidence (float, optional): Confidence level of the intervals. Defaults to 0.95.
+        chunk_size (int, optional): Replications per generator. Defaults to REPLICATION_CHUNK_SIZE.
+        cache (ResultCache, optional): Reuse and store per-replication outputs (needs a seed).
+
+    Returns:
+        List of ScenarioComparison, one per scenario: mean of the five output statistics,
+            mean paired difference to the baseline, its confidence interval half-width, and 
+            the half-width the same number of independent replications would have given.
+    """
+    from statistics import NormalDist
+
+    # Fresh entropy must still be shared by all scenarios
+    if seed is None:
+        seed = npr.SeedSequence().entropy
+        cache = None
+
+    # Shape (scenarios, replications, 5)
+    outputs = np.stack([
+        run_scenario_seeded(scenario, replications, seed, chunk_size, cache)
+        for scenario in scenarios.values()
+    ])
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    differences = outputs - outputs[0]
+    variances = outputs.var(axis=1, ddof=1)
+    return [
+        ScenarioComparison(
+            name,
+            outputs[j].mean(axis=0),
+            differences[j].mean(axis=0),
+            z * differences[j].std(axis=0, ddof=1) / math.sqrt(replications),
+            z * np.sqrt((variances[j] + variances[0]) / replications),
+        )
+        for j, name in enumerate(scenarios)
+    ]
+
+if __name__ == "__main__":
+    run_multiple_sim(
+        iterations=100_000,
+        print_intermediate=True,
+        rel_half_width=0.001,
+    )
+    # print("👆 part (c)")
+
+# %%
+# Part (c) - same scenario on a process pool, reproducible for a given seed
+
+if __name__ == "__main__":
+    print()
+    print("Part c (parallel, seed=103):")
+    run_multiple_sim_parallel(
+        iterations=20_000,
+        seed=103,
+        print_intermediate=True,
+    )
 
 # %%
 # Part (d) - what if we call patients to ensure they arrive on time?
 
-print()
-print("Part d:")
-run_multiple_sim(
-    iterations=10000, 
-    sim_func=lambda:
-        run_radiology_dept_sim(
-            arrival_time_func=lambda scheduled_arrival: scheduled_arrival,
-        )
-)
+if __name__ == "__main__":
+    print()
+    print("Part d:")
+    run_multiple_sim(
+        iterations=10000, 
+        replications_func=lambda r:
+            run_radiology_dept_sim_replications(
+                r,
+                arrival_time_func=lambda scheduled_arrival: scheduled_arrival,
+            )
+    )
 
 
 #%%
 # Part (e) - what if we help patients fill out consent form?
-print()
-print("Part e:")
-run_multiple_sim(
-    iterations=10000, 
-    sim_func=lambda:
-        run_radiology_dept_sim(
-            consent_finished_func=lambda arrive_time: arrive_time + 2,
-        )
-)
+if __name__ == "__main__":
+    print()
+    print("Part e:")
+    run_multiple_sim(
+        iterations=10000, 
+        replications_func=lambda r:
+            run_radiology_dept_sim_replications(
+                r,
+                consent_finished_func=lambda arrive_time: arrive_time + 2,
+            )
+    )
         
 
 
 #%%
 # Part (f) - what if we hire technician to prep exam room?
-print()
-print("Part f:")
-run_multiple_sim(
-    iterations=10000, 
-    sim_func=lambda:
-        run_radiology_dept_sim(
-            room_prepped_func= lambda prev_exam_finished:
-            prev_exam_finished + 5,
-        )
-)
+if __name__ == "__main__":
+    print()
+    print("Part f:")
+    run_multiple_sim(
+        iterations=10000, 
+        replications_func=lambda r:
+            run_radiology_dept_sim_replications(
+                r,
+                room_prep_duration_func=lambda n: np.full(n, 5.0),
+            )
+    )
 
 
 
 #%%
 # Part (g) - what if we build a new patient prep room?
-print()
-print("Part g:")
-run_multiple_sim(
-    iterations=10000, 
-    sim_func=lambda:
-        run_radiology_dept_sim(
-            patient_prepstart_func=lambda consent_finished, prev_exam_finished: consent_finished,
-        )
-)
+if __name__ == "__main__":
+    print()
+    print("Part g:")
+    run_multiple_sim(
+        iterations=10000, 
+        replications_func=lambda r:
+            run_radiology_dept_sim_replications(
+                r,
+                separate_prep_room=True,
+            )
+    )
 # %%
 # Bonus
-print()
-print("Bonus: part g and f combined")
-run_multiple_sim(
-    iterations=1000, 
-    sim_func=lambda:
-        run_radiology_dept_sim(
-            patient_prepstart_func=lambda consent_finished, prev_exam_finished: consent_finished,
-            room_prepped_func= lambda prev_exam_finished: prev_exam_finished + 5,
-        )
+if __name__ == "__main__":
+    print()
+    print("Bonus: part g and f combined")
+    run_multiple_sim(
+        iterations=1000, 
+        replications_func=lambda r:
+            run_radiology_dept_sim_replications(
+                r,
+                separate_prep_room=True,
+                room_prep_duration_func=lambda n: np.full(n, 5.0),
+            )
+    )
+# %%
+# Parts (d) - (g) and bonus against the baseline on common random numbers
+
+if __name__ == "__main__":
+    baseline = RadiologyScenario()
+    comparisons = compare_radiology_scenarios(
+        {
+            "baseline": baseline,
+            "d: on-time arrival": baseline._replace(arrival_jitter=0.0),
+            "e: consent help": baseline._replace(consent_fast_probability=1.0),
+            "f: room prep technician": baseline._replace(room_prep=5.0),
+            "g: patient prep room": baseline._replace(separate_prep_room=True),
+            "bonus: f and g": baseline._replace(room_prep=5.0, separate_prep_room=True),
+        },
+        replications=2000,
+        seed=103,
+        cache=ResultCache(),
+    )
+
+    print()
+    print("Paired differences vs. baseline (95% CI; CRN half-width vs. independent runs):")
+    for comparison in comparisons[1:]:
+        print(f"  {comparison.name}")
+        for label, delta, half_width, independent_half_width in zip(
+            ["Avg time per patient", "Avg time from scheduled", "Exam %", "Room prep %", "Patient prep %"],
+            comparison.delta, comparison.half_width, comparison.independent_half_width,
+        ):
+            print(f"    {label:24} {delta:+10.4g} ± {half_width:.2g}  (independent: ± {independent_half_width:.2g})")
+# %%
+# Event-calendar engine for departments with several exam rooms, technicians and prep areas
+
+import heapq
+from collections import deque
+
+
+RadiologyInputs = namedtuple(
+    'RadiologyInputs', 
+    ['scheduled_arrival', 'arrival', 'consent_finished', 'patient_prep', 'room_prep', 'exam_duration'],
 )
+RadiologyInputs.__doc__ = """Per-patient random inputs of one replication, as arrays of length n_patients.
+
+    room_prep[k] is the duration of the k-th exam room turnover, which in a single-room 
+    department is the one preceding patient k's exam.
+"""
+
+
+def draw_radiology_inputs(scenario: RadiologyScenario, generator: npr.Generator) -> RadiologyInputs:
+    """Draw the random inputs of one replication of a scenario."""
+    n = scenario.n_patients
+    exam_durations = np.asarray(scenario.exam_durations, dtype=np.float64)
+
+    scheduled_arrival = np.arange(n) * scenario.appointment_interval
+    arrival = scheduled_arrival + generator.uniform(-scenario.arrival_jitter, scenario.arrival_jitter, size=n)
+    consent_finished = arrival + np.where(
+        generator.random(n) < scenario.consent_fast_probability, scenario.consent_fast, scenario.consent_slow,
+    )
+    return RadiologyInputs(
+        scheduled_arrival, arrival, consent_finished,
+        generator.exponential(scenario.patient_prep_mean, size=n),
+        np.full(n, float(scenario.room_prep)),
+        exam_durations[generator.integers(len(exam_durations), size=n)],
+    )
+
+
+class _Event:
+    """Entry of the event calendar. Kept in the heap as (time, seq, event), so events never compare."""
+
+    __slots__ = ('kind', 'patient', 'room')
+
+    def __init__(self, kind: int, patient: int, room: int):
+        self.kind = kind
+        self.patient = patient
+        self.room = room
+
+
+_PREP_DONE = 0
+_ROOM_READY = 1
+_EXAM_DONE = 2
+
+
+def run_radiology_des(
+    inputs: RadiologyInputs,
+    w_warmup: int = 100,
+    rooms: int = 1,
+    technicians: int = 1,
+    prep_areas: int = 1,
+    discipline: str = 'appointment',
+    priorities: np.ndarray = None,
+    trace: np.ndarray = None,
+):
+    """Simulate a radiology department with an event calendar.
+
+    Patients join the prep queue when their consent form is done and hold a prep area
+    (changing room) from the start of their prep until their exam finishes. Prepped 
+    patients wait for an exam room that has been turned over and a free technician. 
+    Technicians run exams and room turnovers, exams first; rooms start the day dirty 
+    and exactly one turnover is done per exam. The clock starts at time 0.
+
+    With rooms=1, technicians=1, prep_areas=1 (or prep_areas=None for separate_prep_room=True)
+    and the 'appointment' discipline this is the same model as run_radiology_dept_sim_batch,
+    and it produces the same event times for the same inputs.
+
+    Args:
+        inputs (RadiologyInputs): Per-patient random inputs, e.g. from draw_radiology_inputs.
+        w_warmup (int, optional): Warmup period to skip for statistics calculation. Defaults to 100.
+        rooms (int, optional): Number of exam rooms C. Defaults to 1.
+        technicians (int, optional): Number of technicians T. Defaults to 1.
+        prep_areas (int, optional): Number of prep areas K, or None for unlimited. Defaults to 1.
+        discipline (str, optional): 'fifo' (order of joining the queue), 'priority' (lowest 
+            priorities[patient] first among those waiting) or 'appointment' (strictly in 
+            appointment order: nobody starts prep or an exam before all earlier patients have).
+            With unlimited prep areas, prep always starts right after consent.
+            Defaults to 'appointment'.
+        priorities (np.ndarray, optional): Per-patient priority for 'priority'. 
+        trace (np.ndarray, optional): (8, n_patients) array to record every patient's event 
+            times in, indexed by the *_INDEX constants.
+
+    Returns:
+        Same five statistics as run_radiology_dept_sim. Exam and room-prep percentages are
+            per exam room (divided by rooms).
+    """
+    n = len(inputs.scheduled_arrival)
+    if discipline not in ('fifo', 'priority', 'appointment'):
+        raise ValueError(f"Unknown discipline: {discipline} (expected 'fifo', 'priority' or 'appointment')")
+    fifo = discipline == 'fifo'
+    strict = discipline == 'appointment'
+    # Unlimited prep areas have no queue to keep in order
+    strict_prep = strict and prep_areas is not None
+    if discipline != 'priority' or priorities is None:
+        priorities = range(n)
+    else:
+        priorities = np.asarray(priorities).tolist()
+
+    consent_finished = inputs.consent_finished.tolist()
+    patient_prep = inputs.patient_prep.tolist()
+    room_prep = inputs.room_prep.tolist()
+    exam_duration = inputs.exam_duration.tolist()
+
+    prepstart_times = [0.0] * n
+    prepped_times = [0.0] * n
+    room_prepped_times = [0.0] * n
+    room_prep_durations = [0.0] * n
+    exam_started_times = [0.0] * n
+    exam_finished_times = [0.0] * n
+
+    calendar = []
+    seq = 0
+    now = 0.0
+
+    # Patients finishing consent are fed in time order instead of being pushed on the calendar
+    arrivals = np.argsort(inputs.consent_finished, kind='stable').tolist()
+    next_arrival = 0
+
+    # Heaps of (priority, patient) unless fifo; strict mode only serves the next patient in line
+    prep_queue = deque() if fifo else []
+    exam_queue = deque() if fifo else []
+    next_prep = 0
+    next_exam = 0
+    free_prep_areas = n if prep_areas is None else prep_areas
+    free_technicians = technicians
+    dirty_rooms = deque(range(rooms))
+    ready_rooms = []
+    room_ready_time = [0.0] * rooms
+    room_turnover_start = [0.0] * rooms
+    turnovers = 0
+
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    while True:
+        # Next event: the earlier of the calendar head and the next consent
+        if next_arrival < n and (not calendar or consent_finished[arrivals[next_arrival]] <= calendar[0][0]):
+            p = arrivals[next_arrival]
+            next_arrival += 1
+            t = consent_finished[p]
+            if t > now:
+                now = t
+            if fifo:
+                prep_queue.append(p)
+            else:
+                heappush(prep_queue, (priorities[p], p))
+        elif calendar:
+            now, _, event = heappop(calendar)
+            kind = event.kind
+            if kind == _PREP_DONE:
+                p = event.patient
+                prepped_times[p] = now
+                if fifo:
+                    exam_queue.append(p)
+                else:
+                    heappush(exam_queue, (priorities[p], p))
+            elif kind == _ROOM_READY:
+                free_technicians += 1
+                room_ready_time[event.room] = now
+                ready_rooms.append(event.room)
+            else:
+                free_technicians += 1
+                free_prep_areas += 1
+                dirty_rooms.append(event.room)
+        else:
+            break
+
+        while free_prep_areas and prep_queue and (not strict_prep or prep_queue[0][1] == next_prep):
+            p = prep_queue.popleft() if fifo else heappop(prep_queue)[1]
+            next_prep += 1
+            free_prep_areas -= 1
+            prepstart_times[p] = now
+            heappush(calendar, (now + patient_prep[p], seq, _Event(_PREP_DONE, p, -1)))
+            seq += 1
+
+        while free_technicians and ready_rooms and exam_queue and (not strict or exam_queue[0][1] == next_exam):
+            p = exam_queue.popleft() if fifo else heappop(exam_queue)[1]
+            next_exam += 1
+            room = ready_rooms.pop()
+            free_technicians -= 1
+            room_prepped_times[p] = room_ready_time[room]
+            room_prep_durations[p] = room_ready_time[room] - room_turnover_start[room]
+            exam_started_times[p] = now
+            exam_finished_times[p] = finished = now + exam_duration[p]
+            heappush(calendar, (finished, seq, _Event(_EXAM_DONE, p, room)))
+            seq += 1
+
+        while free_technicians and dirty_rooms and turnovers < n:
+            room = dirty_rooms.popleft()
+            free_technicians -= 1
+            room_turnover_start[room] = now
+            heappush(calendar, (now + room_prep[turnovers], seq, _Event(_ROOM_READY, -1, room)))
+            turnovers += 1
+            seq += 1
+
+    values = trace if trace is not None else np.zeros((8, n))
+    values[SCHEDULED_ARRIVAL_INDEX] = inputs.scheduled_arrival
+    values[ARRIVAL_TIME_INDEX] = inputs.arrival
+    values[CONSENT_TIME_INDEX] = inputs.consent_finished
+    values[PATIENT_PREPSTART_INDEX] = prepstart_times
+    values[PATIENT_PREPPED_INDEX] = prepped_times
+    values[ROOM_PREPPED_INDEX] = room_prepped_times
+    values[EXAM_STARTED_INDEX] = exam_started_times
+    values[EXAM_FINISHED_INDEX] = exam_finished_times
+
+    stats_vals = values[:, w_warmup:]
+    avg_time = np.mean(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[ARRIVAL_TIME_INDEX])
+    avg_time_from_scheduled = np.mean(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[SCHEDULED_ARRIVAL_INDEX])
+    # Room capacity used from the first counted patient's consent to the last exam
+    total_time = stats_vals[EXAM_FINISHED_INDEX].max() - stats_vals[CONSENT_TIME_INDEX, 0]
+    return (
+        avg_time,
+        avg_time_from_scheduled,
+        np.sum(stats_vals[EXAM_FINISHED_INDEX] - stats_vals[EXAM_STARTED_INDEX]) / (rooms * total_time),
+        np.sum(room_prep_durations[w_warmup + 1:]) / (rooms * total_time),
+        np.sum(stats_vals[PATIENT_PREPPED_INDEX] - stats_vals[PATIENT_PREPSTART_INDEX]) / total_time,
+    )
+
+
+if __name__ == "__main__":
+    des_generator = npr.default_rng(103)
+    des_inputs = draw_radiology_inputs(RadiologyScenario(), des_generator)
+    for separate_prep_room in (False, True):
+        same_inputs = dict(
+            scheduled_arrival_func=lambda i: des_inputs.scheduled_arrival,
+            arrival_time_func=lambda scheduled_arrival: des_inputs.arrival,
+            consent_finished_func=lambda arrive_time: des_inputs.consent_finished,
+            patient_prep_duration_func=lambda n: des_inputs.patient_prep,
+            room_prep_duration_func=lambda n: des_inputs.room_prep,
+            exam_duration_func=lambda n: des_inputs.exam_duration,
+        )
+        expected = run_radiology_dept_sim_batch(separate_prep_room=separate_prep_room, **same_inputs)
+        actual = run_radiology_des(des_inputs, prep_areas=None if separate_prep_room else 1)
+        print(f"Event calendar vs. recurrence (separate_prep_room={separate_prep_room}): identical={np.array_equal(expected, actual)}")
+
+    # Twice the patients through two rooms
+    busy_scenario = RadiologyScenario(n_patients=1_000_000, appointment_interval=15.0)
+    des_inputs = draw_radiology_inputs(busy_scenario, des_generator)
+    for rooms, technicians, prep_areas in [(2, 2, 2), (2, 2, 4), (3, 2, 3), (2, 3, 4)]:
+        start = time.perf_counter()
+        results = run_radiology_des(des_inputs, rooms=rooms, technicians=technicians, prep_areas=prep_areas, discipline='fifo')
+        elapsed = time.perf_counter() - start
+        # Four events per patient: consent, prep done, room ready, exam done
+        print(f"C={rooms} T={technicians} K={prep_areas}: avg time {results[0]:.2f} min, "
+              f"exam room busy {results[2]:.1%}, {4 * busy_scenario.n_patients / elapsed / 1e6:.2f}M events/s")
+# %%
+# Warmup length picked from the output instead of the fixed w_warmup=100
+
+def detect_radiology_warmup(
+    scenario: RadiologyScenario = RadiologyScenario(n_patients=2000),
+    replications: int = 4096,
+    seed=None,
+    batch_size: int = 5,
+) -> int:
+    """Pick w_warmup for a scenario with MSER-5 on pilot replications.
+
+    The pilot replications' per-patient time in system is averaged across replications
+    and mser_warmup picks the number of leading patients to skip. The pilot should be 
+    several times longer than the expected warmup.
+    """
+    time_in_system = np.zeros(scenario.n_patients)
+    run_scenario_replications(
+        scenario._replace(w_warmup=0), replications, npr.default_rng(seed), mean_time_in_system=time_in_system,
+    )
+    return mser_warmup(time_in_system, batch_size)
+
+
+if __name__ == "__main__":
+    detected_warmup = detect_radiology_warmup(seed=103)
+    print()
+    print(f"MSER-5 warmup: {detected_warmup} patients instead of the fixed 100")
+
+    for n_patients, w_warmup in [(10000, 100), (detected_warmup + 5000, detected_warmup)]:
+        result = run_multiple_sim(
+            iterations=100_000,
+            replications_func=lambda r: run_radiology_dept_sim_replications(r, n_patients=n_patients, w_warmup=w_warmup),
+            rel_half_width=0.001,
+        )
+        print(f"n_patients={n_patients}, w_warmup={w_warmup}: {result.iterations * n_patients:,} patients simulated")
+# %%
+# Where the time goes: per-stage profile of the scalar and replication engines
+
+if __name__ == "__main__":
+    profiler = SimProfiler()
+    for _ in range(10):
+        run_radiology_dept_sim(profiler=profiler)
+    run_multiple_sim(iterations=4096, profiler=profiler)
+
+    report = profiler.report()
+    print()
+    print(f"{report['patients']:,} patients in {report['seconds']:.2f}s ({report['patients_per_second']:,.0f} patients/s), "
+          f"{report['rng_draws']:,} RNG draws")
+    for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"  {name:28} {stage['calls']:9,} calls {stage['seconds']:8.3f}s {stage['mean_us']:9.2f} us/call")
+    profiler.save('radiology_profile.json')
 # %%
@@ -2,20 +2,85 @@
 
 
 import math
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+# Market defaults shared by the solvers and the benchmark labels below
+TICKET_FARE = 200
+AIRCRAFT_SIZES = (80, 100, 120)
+OPERATING_COST_BASE = 2000
+OPERATING_COST_PER_SEAT = 80
+
+
+def airline_operating_costs(aircraft_sizes, operating_cost_base=OPERATING_COST_BASE, operating_cost_per_seat=OPERATING_COST_PER_SEAT):
+    """Cost per flight of each aircraft type: a base cost plus a cost per seat."""
+    return [operating_cost_base + operating_cost_per_seat * seats for seats in aircraft_sizes]
+
+
+AirlineMarket = namedtuple(
+    'AirlineMarket', 
+    ['flights', 'flights_pow', 'capacity', 'costs', 'm_market_size', 'p_ticket_fare'],
+)
+AirlineMarket.__doc__ = """Best-response grid over (flight count, aircraft type), shared by all airlines.
+
+    flights: Candidate flight counts 0..F-1.
+    flights_pow: flights ** 1.5.
+    capacity, costs: (F, aircraft types) seats and operating cost of each candidate.
+"""
+
+
+def build_airline_market(m_market_size, p_ticket_fare, aircraft_sizes, operating_costs) -> AirlineMarket:
+    """Candidate grid for a market. Flight counts stop where even a full market can't cover the cheapest flight."""
+    max_flights_to_consider_offering = max(
+        m_market_size / (cost / p_ticket_fare) for cost in operating_costs
+    )
+    flights = np.arange(math.ceil(max_flights_to_consider_offering))
+    return AirlineMarket(
+        flights,
+        np.array([pow(xi, 1.5) for xi in range(len(flights))]),
+        flights[:, None] * np.array(aircraft_sizes)[None, :],
+        flights[:, None] * np.array(operating_costs)[None, :],
+        m_market_size,
+        p_ticket_fare,
+    )
+
+
+def best_responses(market: AirlineMarket, others_pow: np.ndarray):
+    """Profit-maximizing (flights, aircraft type) of airlines facing competitors' sum of flights ** 1.5.
+
+    Ties go to the fewest flights, then the first aircraft type.
+
+    Returns:
+        (profits, flight counts, aircraft type indices), each shaped like others_pow.
+    """
+    others_pow = np.asarray(others_pow, dtype=np.float64)
+    denom = others_pow[:, None] + market.flights_pow[None, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        market_share = np.where(denom == 0, 0.0, market.flights_pow[None, :] / denom)
+    max_market_passengers = np.floor(market_share * market.m_market_size)
+
+    # Shape (airlines, flight counts, aircraft types)
+    profit = (
+        np.minimum(market.capacity[None, :, :], max_market_passengers[:, :, None]) * market.p_ticket_fare
+        - market.costs[None, :, :]
+    )
+    best = np.argmax(profit.reshape(len(others_pow), -1), axis=1)
+    flights, type_index = np.unravel_index(best, market.capacity.shape)
+    return profit.reshape(len(others_pow), -1)[np.arange(len(others_pow)), best], flights, type_index
+
 
 def solve_airline_problem(
     xi_airline_initial_flights = [0, 0],
     si_airline_initial_aircraft = [100, 100],
     m_market_size = 1000,
-    p_ticket_fare = 200,
-    aircraft_sizes = [
-        80,
-        100,
-        120,
-    ],
+    p_ticket_fare = TICKET_FARE,
+    aircraft_sizes = AIRCRAFT_SIZES,
     
-    operating_cost_base = 2000,
-    operating_cost_per_seat = 80,
+    operating_cost_base = OPERATING_COST_BASE,
+    operating_cost_per_seat = OPERATING_COST_PER_SEAT,
 
     iterations_max = 1000,
     flights_offered_convergence_tolerance = 0,
@@ -25,19 +90,8 @@ def solve_airline_problem(
     x = [xi for xi in xi_airline_initial_flights]
     s = [si for si in si_airline_initial_aircraft]
 
-    operating_costs = [
-        operating_cost_base + operating_cost_per_seat * seats
-        for seats in aircraft_sizes
-    ]
-    min_profitable_passengers_by_flight_capacity = [
-        cost / p_ticket_fare
-        for cost in operating_costs   
-    ]
-    max_profitable_flights_by_aircraft_size = [
-        m_market_size / min_passengers
-        for min_passengers in min_profitable_passengers_by_flight_capacity
-    ]
-    max_flights_to_consider_offering = max(max_profitable_flights_by_aircraft_size)
+    operating_costs = airline_operating_costs(aircraft_sizes, operating_cost_base, operating_cost_per_seat)
+    market = build_airline_market(m_market_size, p_ticket_fare, aircraft_sizes, operating_costs)
 
     def calculate_market_share(i, xi=None):
         # other_sum = sum(x) - x[i]
@@ -55,11 +109,17 @@ def solve_airline_problem(
         if market_share is None:
             market_share = calculate_market_share(i, xi)
 
-        max_capacity_passengers = xi_candidate * s_aircraft_size_candidate
+        max_capacity_passengers = xi * si
         max_market_passengers = math.floor(market_share * m_market_size)
         passengers = min(max_capacity_passengers, max_market_passengers)
         return passengers * p_ticket_fare - xi * (operating_cost_base + (operating_cost_per_seat * si))
 
+    def best_response(i):
+        """(profit, flights, aircraft size) maximizing airline i's profit given the others' flights."""
+        others_pow = sum(pow(v, 1.5) for v in x[:i]) + sum(pow(v, 1.5) for v in x[i+1:])
+        profits, flights, size_index = best_responses(market, [others_pow])
+        return profits[0].item(), int(flights[0]), aircraft_sizes[size_index[0]]
+
     def print_status(indent=""):
         for i in range(len(x)):
             print(f"{indent}Airlines {i+1} - flights={x[i]}, capacity={s[i]}, market share={100 * calculate_market_share(i):.1}%, profit=${calculate_profit(i) / 1000:.2f}k")
@@ -71,25 +131,7 @@ def solve_airline_problem(
 
         for i_airline in range(len(x)):
 
-            max_profit = -math.inf
-            chosen_si_aircraft_size = 0
-            chosen_xi_flights_offered = 0
-
-            for xi_candidate in range(math.ceil(max_flights_to_consider_offering)):
-                market_share = calculate_market_share(i_airline, xi_candidate)
-                xi_profit = -math.inf
-                xi_si = 0
-                for s_aircraft_size_candidate in aircraft_sizes:
-                    profit = calculate_profit(i_airline, xi_candidate, s_aircraft_size_candidate, market_share)
-                    if profit > max_profit:
-                        max_profit = profit
-                        chosen_si_aircraft_size = s_aircraft_size_candidate
-                        chosen_xi_flights_offered = xi_candidate
-                    if profit > xi_profit:
-                        xi_profit = profit
-                        xi_si = s_aircraft_size_candidate
-                
-                # print(f"\t\t\tAirline {i_airline + 1}: {xi_candidate=} si:{xi_si}  profit:${xi_profit / 1000.0:.1f}k,  market share:{market_share:.2%}" + ("  ⭐️" if chosen_xi_flights_offered==xi_candidate else ""))
+            max_profit, chosen_xi_flights_offered, chosen_si_aircraft_size = best_response(i_airline)
 
             prev_flights = x[i_airline]
             prev_aircraft_size = s[i_airline]
@@ -135,6 +177,92 @@ def solve_airline_problem(
     print_status("\t")
     return x, s, False
 
+def solve_airline_equilibrium(
+    flights,
+    aircraft,
+    m_market_size = 1000,
+    p_ticket_fare = TICKET_FARE,
+    aircraft_sizes = AIRCRAFT_SIZES,
+    operating_costs = None,
+    operating_cost_base = OPERATING_COST_BASE,
+    operating_cost_per_seat = OPERATING_COST_PER_SEAT,
+    update = 'gauss-seidel',
+    workers = None,
+    iterations_max = 1000,
+    flights_offered_convergence_tolerance = 0,
+    verbose = False,
+):
+    """Best-response iteration for N airlines choosing flights and an aircraft type.
+
+    Same market model as solve_airline_problem. The competitors' sum of flights ** 1.5 is 
+    computed once per best response rather than once per candidate, and each best 
+    response is one NumPy grid (see best_responses). The sum is exactly rounded 
+    (math.fsum), so symmetric airlines see exactly symmetric market shares.
+
+    Jacobi updates can cycle in this game: identical airlines that move together all
+    enter a profitable market, then all leave it. Gauss-Seidel is the robust choice for
+    finding an equilibrium; a Jacobi iteration started from one confirms it in one step.
+
+    Args:
+        flights: Initial flights of each airline.
+        aircraft: Initial aircraft size of each airline (a value from aircraft_sizes).
+        aircraft_sizes: Seats of each aircraft type in the fleet catalogue.
+        operating_costs (optional): Cost per flight of each aircraft type. Defaults to
+            operating_cost_base + operating_cost_per_seat * seats.
+        update (str, optional): 'gauss-seidel' (airlines respond one after another to the 
+            latest decisions) or 'jacobi' (all respond at once to the previous iteration's 
+            decisions). Defaults to 'gauss-seidel'.
+        workers (int, optional): Threads computing Jacobi best responses, each for a block of
+            airlines. NumPy releases the GIL on the grid operations. Defaults to 1.
+        Other arguments: As in solve_airline_problem.
+
+    Returns:
+        (flights, aircraft sizes, converged)
+    """
+    if update not in ('gauss-seidel', 'jacobi'):
+        raise ValueError(f"Unknown update: {update} (expected 'gauss-seidel' or 'jacobi')")
+    if operating_costs is None:
+        operating_costs = airline_operating_costs(aircraft_sizes, operating_cost_base, operating_cost_per_seat)
+    market = build_airline_market(m_market_size, p_ticket_fare, aircraft_sizes, operating_costs)
+
+    size_index = {size: j for j, size in enumerate(aircraft_sizes)}
+    x = np.array(flights, dtype=np.int64)
+    t = np.array([size_index[size] for size in aircraft], dtype=np.int64)
+    sizes = np.asarray(aircraft_sizes)
+    blocks = np.array_split(np.arange(len(x)), max(1, min(workers or 1, len(x))))
+
+    executor = ThreadPoolExecutor(len(blocks)) if update == 'jacobi' and len(blocks) > 1 else None
+    try:
+        for iteration_i in range(iterations_max):
+            prev_x, prev_t = x.copy(), t.copy()
+            x_pow = [pow(v, 1.5) for v in x.tolist()]
+
+            if update == 'jacobi':
+                others_pow = np.array([math.fsum(x_pow[:i] + x_pow[i+1:]) for i in range(len(x))])
+                if executor is None:
+                    _, x, t = best_responses(market, others_pow)
+                else:
+                    results = list(executor.map(lambda block: best_responses(market, others_pow[block]), blocks))
+                    x = np.concatenate([flights for _, flights, _ in results])
+                    t = np.concatenate([type_index for _, _, type_index in results])
+            else:
+                for i in range(len(x)):
+                    _, flights_i, type_i = best_responses(market, [math.fsum(x_pow[:i] + x_pow[i+1:])])
+                    x[i], t[i] = flights_i[0], type_i[0]
+                    x_pow[i] = pow(int(x[i]), 1.5)
+
+            deviation = np.abs(x - prev_x).sum() + np.abs(sizes[t] - sizes[prev_t]).sum()
+            if verbose:
+                print(f"\tIteration {iteration_i + 1}: {np.count_nonzero((x != prev_x) | (t != prev_t))} airlines changed")
+            if deviation <= flights_offered_convergence_tolerance:
+                return x.tolist(), [aircraft_sizes[j] for j in t], True
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return x.tolist(), [aircraft_sizes[j] for j in t], False
+
+
 solve_airline_problem()
 print("👆 base problem. Starting values: x=(0, 0), s=(100, 100)")
 print()
@@ -163,4 +291,30 @@ for i, (x_start, s_start) in enumerate([
     )
     print()
     print()
-    
\ No newline at end of file
+    
+
+start = time.perf_counter()
+solve_airline_problem(m_market_size=100_000, verbose=False)
+elapsed = time.perf_counter() - start
+large_market = build_airline_market(100_000, TICKET_FARE, AIRCRAFT_SIZES, airline_operating_costs(AIRCRAFT_SIZES))
+print(f"👆 large market (m=100,000, {len(large_market.flights):,} candidate flight counts per best response) solved in {elapsed:.3f}s")
+
+# Dozens of carriers and a larger fleet catalogue
+n_carriers = 40
+fleet = [50, 70, 90, 110, 130, 150, 180, 220, 280, 350]
+
+start = time.perf_counter()
+x, s, converged = solve_airline_equilibrium(
+    [0] * n_carriers, [fleet[0]] * n_carriers, m_market_size=50_000, aircraft_sizes=fleet,
+)
+print(f"👆 {n_carriers} carriers, {len(fleet)} aircraft types, Gauss-Seidel: "
+      f"{'converged' if converged else 'did not converge'} in {time.perf_counter() - start:.3f}s, "
+      f"flying (flights, aircraft): {[(xi, si) for xi, si in zip(x, s) if xi > 0]}")
+
+for workers in [1, 4]:
+    start = time.perf_counter()
+    _, _, is_equilibrium = solve_airline_equilibrium(
+        x, s, m_market_size=50_000, aircraft_sizes=fleet, update='jacobi', workers=workers, iterations_max=1,
+    )
+    print(f"👆 Jacobi check from that point ({workers} worker(s)): "
+          f"{'no airline wants to deviate' if is_equilibrium else 'not an equilibrium'}, {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,114 @@
+"""
+    Helpers shared by the simulation homeworks (hw5, hw6).
+
+    ResultCache keeps simulation outputs on disk under a content-addressed key, so a
+    repeated seeded run is read back instead of simulated again. mser_warmup picks how
+    much of a run's start to discard as warmup.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+
+class ResultCache:
+    """Per-replication outputs on disk, one .npz per key, evicted least recently used first.
+
+    Args:
+        directory (str, optional): Where to keep the files. Defaults to '.simcache'.
+        max_bytes (int, optional): Total size to stay under after each write. Defaults to 256 MB.
+    """
+
+    def __init__(self, directory='.simcache', max_bytes=256 << 20):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(**params) -> str:
+        """SHA-256 of the parameters as canonical JSON, independent of argument order and types.
+
+        Callers include a model version among the parameters and bump it whenever a change
+        to the model or its random draws would alter the cached outputs.
+        """
+        def canonical(value):
+            if isinstance(value, (tuple, list, np.ndarray)):
+                return [canonical(v) for v in value]
+            if isinstance(value, dict):
+                return {k: canonical(v) for k, v in value.items()}
+            if isinstance(value, np.generic):
+                return value.item()
+            return value
+
+        text = json.dumps(canonical(params), sort_keys=True)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """Cached outputs for key, or None. Marks the entry as recently used."""
+        path = self.directory / f'{key}.npz'
+        try:
+            with np.load(path) as data:
+                outputs = data['outputs']
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return outputs
+
+    def put(self, key: str, outputs: np.ndarray):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write beside the final file and swap in, so readers never see a partial file
+            fd, staging_path = tempfile.mkstemp(prefix=key, suffix='.npz.tmp', dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, outputs=outputs)
+            os.replace(staging_path, self.directory / f'{key}.npz')
+            self._evict(keep=key)
+        except OSError:
+            # Caching is best-effort (e.g. read-only directory)
+            pass
+
+    def _evict(self, keep: str):
+        entries = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Evicted by another process since the listing
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path.stem != keep:
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+def mser_warmup(series, batch_size: int = 5, max_fraction: float = 0.5) -> int:
+    """MSER-k truncation point (White, 1997) of an output series.
+
+    Averages the series in batches of batch_size, then picks the number of leading 
+    batches d that minimizes the squared standard error of the mean of the rest, 
+    sum((Z_j - mean)^2) / (m - d)^2. Only the first max_fraction of the batches are 
+    candidates, since a minimum near the end means the run is too short to tell.
+
+    Returns:
+        int: Number of leading observations to delete (a multiple of batch_size).
+    """
+    series = np.asarray(series, dtype=np.float64)
+    m = len(series) // batch_size
+    if m < 2:
+        return 0
+    batches = series[:m * batch_size].reshape(m, batch_size).mean(axis=1)
+
+    # Suffix sums give the mean and sum of squares of batches d..m-1 for every d at once
+    kept = np.arange(m, 0, -1)
+    suffix_sum = np.cumsum(batches[::-1])[::-1]
+    suffix_sum_sq = np.cumsum((batches * batches)[::-1])[::-1]
+    sse = suffix_sum_sq - suffix_sum * suffix_sum / kept
+    candidates = max(1, int(m * max_fraction))
+    return int(np.argmin(sse[:candidates] / kept[:candidates] ** 2)) * batch_size